@@ -3,8 +3,11 @@ Database Initialization Script
 Run this script to create and initialize the database
 """
 
+import contextlib
+import io
 import os
-from models.models import db, init_database, add_sample_data
+import sys
+from models.models import db, engine_options, init_app, init_database, add_sample_data
 
 def main():
     """Main function to initialize database"""
@@ -20,21 +23,30 @@ def main():
     app.config['SECRET_KEY'] = 'your-secret-key-here'
     app.config['SQLALCHEMY_DATABASE_URI'] = db_uri
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(db_uri)
     
-    # Initialize database with app
-    db.init_app(app)
+    # Initialize database with app (and its connection pragmas)
+    init_app(app)
     
-    with app.app_context():
-        print("Initializing database...")
-        init_database()
-        
-        print("\nAdding sample data...")
-        add_sample_data()
-        
-        print(f"\nDatabase created successfully at: {db_uri}")
-        print("\nDefault Login Credentials:")
-        print("Admin: username=admin, password=admin123")
-        print("Student: username=student1, password=student123")
+    # Collect progress messages and write them out in one go
+    output = io.StringIO()
+    try:
+        with app.app_context(), contextlib.redirect_stdout(output):
+            print("Initializing database...")
+            init_database()
+            
+            print("\nAdding sample data...")
+            add_sample_data()
+            
+            # Write the admin user and sample data in a single transaction
+            db.session.commit()
+            
+            print(f"\nDatabase created successfully at: {db_uri}")
+            print("\nDefault Login Credentials:")
+            print("Admin: username=admin, password=admin123")
+            print("Student: username=student1, password=student123")
+    finally:
+        sys.stdout.write(output.getvalue())
 
 if __name__ == '__main__':
     main()
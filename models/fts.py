@@ -0,0 +1,37 @@
+"""
+Full-Text Search Schema
+SQLite FTS5 DDL shared by the ORM models and simple_app, which use the
+same database file
+"""
+
+# SQLite FTS5 indexes over the searchable text columns of each table, kept
+# in sync by triggers. The trigram tokenizer matches any substring of 3+
+# characters, so they return the same rows as the LIKE '%term%' searches
+# they replace.
+FTS_COLUMNS = {
+    'books': ('title', 'author', 'isbn'),
+    'users': ('full_name', 'username', 'email'),
+}
+
+def fts_ddl(table):
+    """Statements creating, syncing and filling the FTS index for table"""
+    fts = f'{table}_fts'
+    columns = ', '.join(FTS_COLUMNS[table])
+    new_values = ', '.join(f'new.{c}' for c in FTS_COLUMNS[table])
+    old_values = ', '.join(f'old.{c}' for c in FTS_COLUMNS[table])
+    return (
+        f"""CREATE VIRTUAL TABLE {fts} USING fts5(
+            {columns}, content='{table}', content_rowid='id', tokenize='trigram'
+        )""",
+        f"""CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values});
+        END""",
+        f"""CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+        END""",
+        f"""CREATE TRIGGER {fts}_au AFTER UPDATE OF {columns} ON {table} BEGIN
+            INSERT INTO {fts}({fts}, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO {fts}(rowid, {columns}) VALUES (new.id, {new_values});
+        END""",
+        f"INSERT INTO {fts}({fts}) VALUES ('rebuild')",
+    )
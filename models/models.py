@@ -3,12 +3,120 @@ Database Models for Library Management System
 This file contains all the database models using SQLAlchemy ORM
 """
 
+import base64
+import binascii
+import json
+import sqlite3
 from datetime import datetime, date
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
+from sqlalchemy import column, event, func, inspect, or_, select, text, tuple_, union
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.schema import CreateIndex
+from models.fts import FTS_COLUMNS, fts_ddl
+
+try:
+    from argon2 import PasswordHasher
+    from argon2.exceptions import InvalidHashError, VerificationError
+except ImportError:  # argon2-cffi not installed; keep werkzeug's PBKDF2
+    PasswordHasher = None
 
 db = SQLAlchemy()
 
+# Argon2id costs tuned for a few tens of milliseconds per hash on one core
+_password_hasher = (PasswordHasher(time_cost=2, memory_cost=65536, parallelism=2)
+                    if PasswordHasher else None)
+
+# Hash checked when no matching account exists, created on first use
+_dummy_password_hash = None
+
+# Whether each FTS index exists, looked up on first search
+_fts_available = {}
+
+# Connection pool sized for concurrent report/export requests; stale
+# connections are detected before use and recycled every 30 minutes
+POOL_OPTIONS = {
+    'pool_size': 25,
+    'max_overflow': 25,
+    'pool_pre_ping': True,
+    'pool_recycle': 1800,
+}
+
+# Applied to every new connection of the app's SQLite engine (registered by
+# init_app): WAL so readers do not block the writer, fewer fsyncs, a
+# 64 MB page cache and memory-mapped reads
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA cache_size=-64000',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA foreign_keys=ON',
+)
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Apply SQLITE_PRAGMAS to each new pooled SQLite connection"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+def init_app(app):
+    """Bind db to app and apply SQLITE_PRAGMAS to its engine's connections"""
+    db.init_app(app)
+    # init_app creates the engine; listen before any connection is opened
+    with app.app_context():
+        event.listen(db.engine, 'connect', set_sqlite_pragmas)
+
+def hash_password(password):
+    """Hash a password with argon2, or werkzeug's PBKDF2 without argon2-cffi"""
+    if _password_hasher is not None:
+        return _password_hasher.hash(password)
+    from werkzeug.security import generate_password_hash
+    return generate_password_hash(password)
+
+def verify_password(password_hash, password):
+    """Check a password against an argon2 or (legacy) werkzeug hash"""
+    if password_hash.startswith('$argon2'):
+        if _password_hasher is None:
+            return False
+        try:
+            return _password_hasher.verify(password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    from werkzeug.security import check_password_hash
+    return check_password_hash(password_hash, password)
+
+def check_dummy_password(password):
+    """Spend the same time as a real password check, always failing
+    
+    Used when no (active) account matches, so login takes equally long
+    whether or not the username exists.
+    """
+    global _dummy_password_hash
+    if _dummy_password_hash is None:
+        _dummy_password_hash = hash_password('invalid')
+    verify_password(_dummy_password_hash, password)
+    return False
+
+def password_needs_rehash(password_hash):
+    """Whether a stored hash predates the current argon2 settings"""
+    if _password_hasher is None:
+        return False
+    if not password_hash.startswith('$argon2'):
+        return True
+    return _password_hasher.check_needs_rehash(password_hash)
+
+def engine_options(database_uri):
+    """Return SQLALCHEMY_ENGINE_OPTIONS for an app using these models"""
+    # In-memory SQLite runs on a single shared connection (StaticPool),
+    # which takes no pool sizing
+    if database_uri in ('sqlite://', 'sqlite:///:memory:'):
+        return {}
+    return dict(POOL_OPTIONS)
+
 class User(UserMixin, db.Model):
     """User model for authentication and user management"""
     __tablename__ = 'users'
@@ -16,23 +124,60 @@ class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
+    
+    # Case-insensitive lookups (func.lower(...) == value) use these indexes.
+    # Not unique: older databases may hold names differing only in case.
+    __table_args__ = (
+        db.Index('ix_users_lower_username', func.lower(username)),
+        db.Index('ix_users_lower_email', func.lower(email)),
+        db.Index('ix_users_created_at', 'created_at'),
+        db.Index('ix_users_active_name', 'is_active', 'full_name'),
+    )
+
+    password_hash = db.Column(db.String(255), nullable=False)
     full_name = db.Column(db.String(100), nullable=False)
     phone = db.Column(db.String(20))
     address = db.Column(db.Text)
     user_type = db.Column(db.String(20), nullable=False, default='student')  # 'admin' or 'student'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     is_active = db.Column(db.Boolean, default=True)
+    # Loans issued and not yet returned; kept up to date by issue_book and
+    # return_book so profile pages don't have to count transactions
+    active_loans = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     
     # Relationships
     transactions = db.relationship('Transaction', backref='user', lazy=True)
     
     def __repr__(self):
         return f'<User {self.username}>'
+    
+    def set_password(self, password):
+        """Store a hash of password"""
+        self.password_hash = hash_password(password)
+    
+    def check_password(self, password):
+        """Check password, upgrading a legacy hash in place on success
+        
+        The upgraded hash is only added to the session; the caller commits.
+        """
+        if not verify_password(self.password_hash, password):
+            return False
+        if password_needs_rehash(self.password_hash):
+            self.set_password(password)
+        return True
 
 class Book(db.Model):
     """Book model for library catalog"""
     __tablename__ = 'books'
+    __table_args__ = (
+        db.Index('ix_books_active_category', 'is_active', 'category'),
+        db.Index('ix_books_active_avail_title', 'is_active', 'available_copies', 'title'),
+        # SQLite's LIKE is case-insensitive, so prefix LIKEs can only seek
+        # in NOCASE indexes (see book_search_filter's prefix mode)
+        db.Index('ix_books_title_nocase', text('title COLLATE NOCASE')).ddl_if(dialect='sqlite'),
+        db.Index('ix_books_author_nocase', text('author COLLATE NOCASE')).ddl_if(dialect='sqlite'),
+        db.Index('ix_books_isbn_nocase', text('isbn COLLATE NOCASE')).ddl_if(dialect='sqlite'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
@@ -61,6 +206,16 @@ class Book(db.Model):
 class Transaction(db.Model):
     """Transaction model for book issue/return records"""
     __tablename__ = 'transactions'
+    __table_args__ = (
+        db.Index('ix_tx_status_due', 'status', 'due_date'),
+        db.Index('ix_tx_user_status', 'user_id', 'status'),
+        db.Index('ix_tx_book_status', 'book_id', 'status'),
+        db.Index('ix_tx_user_book_status', 'user_id', 'book_id', 'status'),
+        db.Index('ix_tx_user_created', 'user_id', db.text('created_at DESC')),
+        db.Index('ix_tx_issue_date', 'issue_date'),
+        db.Index('ix_tx_return_date', 'return_date'),
+        db.Index('ix_tx_created_at', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -78,22 +233,26 @@ class Transaction(db.Model):
     def __repr__(self):
         return f'<Transaction {self.id}>'
     
-    def is_overdue(self):
-        """Check if transaction is overdue"""
+    def is_overdue(self, now=None):
+        """Check if transaction is overdue (as of `now`, default the current time)"""
         if self.return_date:
             return False
-        return datetime.utcnow() > self.due_date
+        return (now or datetime.utcnow()) > self.due_date
     
-    def days_overdue(self):
-        """Calculate number of days overdue"""
-        if not self.is_overdue():
+    def days_overdue(self, now=None):
+        """Calculate number of days overdue (as of `now`, default the current time)"""
+        now = now or datetime.utcnow()
+        if not self.is_overdue(now):
             return 0
-        today = datetime.utcnow()
-        return (today - self.due_date).days
+        return (now - self.due_date).days
 
 class Fine(db.Model):
     """Fine model for late return penalties"""
     __tablename__ = 'fines'
+    __table_args__ = (
+        db.Index('ix_fines_status', 'status'),
+        db.Index('ix_fines_created_at', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     transaction_id = db.Column(db.Integer, db.ForeignKey('transactions.id'), nullable=False)
@@ -106,25 +265,161 @@ class Fine(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     paid_date = db.Column(db.DateTime)
     
+    # Remaining amount to be paid, computed by the database so it can be
+    # aggregated in SQL as well as read per row
+    remaining_amount = db.column_property(total_amount - func.coalesce(paid_amount, 0))
+    
     def __repr__(self):
         return f'<Fine {self.id}>'
     
-    def remaining_amount(self):
-        """Calculate remaining amount to be paid"""
-        return self.total_amount - self.paid_amount
-    
     def is_fully_paid(self):
         """Check if fine is fully paid"""
         return self.paid_amount >= self.total_amount
 
+def _has_fts(bind, table):
+    """Check whether the FTS index for table exists in the database"""
+    if bind.dialect.name != 'sqlite':
+        return False
+    return bind.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+    ), {'name': f'{table}_fts'}).first() is not None
+
+def _search_filter(model, search, prefix=False):
+    """Filter clause for rows of model whose FTS_COLUMNS contain search
+    
+    With prefix=True, searches the FTS index cannot serve match columns
+    that start with search instead, one indexed LIKE probe per column
+    combined with UNION, rather than a LIKE '%term%' scan of every row.
+    """
+    table = model.__tablename__
+    if table not in _fts_available:
+        _fts_available[table] = _has_fts(db.session.connection(), table)
+    
+    # Trigrams cannot match terms shorter than 3 characters
+    if _fts_available[table] and len(search) >= 3:
+        phrase = '"' + search.replace('"', '""') + '"'
+        return model.id.in_(
+            text(f"SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH :phrase")
+            .bindparams(phrase=phrase)
+            .columns(column('rowid'))
+        )
+    
+    columns = [getattr(model, c) for c in FTS_COLUMNS[table]]
+    if prefix:
+        # The pattern is bound as one string (not search || '%') so SQLite
+        # can turn each LIKE into an index range
+        pattern = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        return model.id.in_(union(*(
+            select(model.id).where(col.like(pattern, escape='\\')) for col in columns
+        )))
+    
+    return or_(*(col.contains(search) for col in columns))
+
+def book_search_filter(search, prefix=False):
+    """Filter clause for books whose title, author or ISBN contains search
+    
+    Autocomplete passes prefix=True to match the start of each field when
+    full-text search is unavailable; see _search_filter.
+    """
+    return _search_filter(Book, search, prefix)
+
+def user_search_filter(search):
+    """Filter clause for users whose name, username or email contains search"""
+    return _search_filter(User, search)
+
+def query_exists(query):
+    """Check whether query matches any row, stopping at the first match"""
+    return db.session.query(query.exists()).scalar()
+
+def _encode_cursor(values):
+    """Serialize key values into an opaque, URL-safe page cursor"""
+    raw = json.dumps([v.isoformat() if isinstance(v, datetime) else v for v in values])
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii')
+
+def _decode_cursor(cursor, key_columns):
+    """Parse a page cursor back into key values, or None if it is invalid"""
+    if not cursor:
+        return None
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        if not isinstance(raw, list) or len(raw) != len(key_columns):
+            return None
+        return tuple(
+            datetime.fromisoformat(value) if col.type.python_type is datetime else value
+            for col, value in zip(key_columns, raw)
+        )
+    except (ValueError, TypeError, binascii.Error):
+        return None
+
+def keyset_page(query, key_columns, cursor, per_page, descending=True):
+    """Fetch the page of query that follows cursor, ordered by key_columns
+    
+    Seeks past the previous page with a WHERE on the key instead of an
+    OFFSET, and skips the COUNT(*) that paginate() runs, so every page
+    costs the same however deep it is. key_columns must end with a unique
+    column. Returns (items, next_cursor); next_cursor is None on the last
+    page.
+    """
+    values = _decode_cursor(cursor, key_columns)
+    if values is not None:
+        key = tuple_(*key_columns)
+        query = query.filter(key < tuple_(*values) if descending else key > tuple_(*values))
+    
+    order = [col.desc() if descending else col for col in key_columns]
+    items = query.order_by(*order).limit(per_page + 1).all()
+    
+    next_cursor = None
+    if len(items) > per_page:
+        items = items[:per_page]
+        next_cursor = _encode_cursor([getattr(items[-1], col.key) for col in key_columns])
+    return items, next_cursor
+
+def create_search_index():
+    """Create the full-text search indexes if SQLite supports them"""
+    for table in FTS_COLUMNS:
+        with db.engine.connect() as conn:
+            if conn.dialect.name != 'sqlite' or _has_fts(conn, table):
+                continue
+        
+        try:
+            with db.engine.begin() as conn:
+                for statement in fts_ddl(table):
+                    conn.execute(text(statement))
+        except OperationalError:
+            # FTS5 or the trigram tokenizer (SQLite 3.34+) is unavailable;
+            # searches keep using LIKE
+            return
+
 # Database initialization helper functions
 def init_database():
-    """Initialize database with default admin user"""
-    from werkzeug.security import generate_password_hash
+    """Initialize database with default admin user
     
+    The admin user is added to the session but not committed; the caller
+    commits it together with any sample data in one transaction.
+    """
     # Create all tables
     db.create_all()
     
+    # create_all() doesn't add columns to existing tables; add the loan
+    # counter to older databases and fill it from their open transactions
+    if 'active_loans' not in {c['name'] for c in inspect(db.engine).get_columns('users')}:
+        with db.engine.begin() as conn:
+            conn.execute(text("ALTER TABLE users ADD COLUMN active_loans INTEGER NOT NULL DEFAULT 0"))
+            conn.execute(text(
+                "UPDATE users SET active_loans = (SELECT COUNT(*) FROM transactions "
+                "WHERE transactions.user_id = users.id AND transactions.return_date IS NULL)"
+            ))
+    
+    # create_all() skips tables that already exist, so add any indexes
+    # introduced since an existing database was created. IF NOT EXISTS
+    # rather than checkfirst, since reflection skips expression indexes.
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+    
+    create_search_index()
+    
     # Check if admin user exists
     admin = User.query.filter_by(username='admin').first()
     if not admin:
@@ -132,21 +427,20 @@ def init_database():
         admin = User(
             username='admin',
             email='admin@library.com',
-            password_hash=generate_password_hash('admin123'),
+            password_hash=hash_password('admin123'),
             full_name='Library Administrator',
             user_type='admin'
         )
         db.session.add(admin)
-        db.session.commit()
         print("Default admin user created: username=admin, password=admin123")
     
     print("Database initialized successfully!")
 
 def add_sample_data():
-    """Add sample data for testing"""
-    # Sample books
+    """Add sample data for testing (committed by the caller)"""
+    # Sample books, inserted with a single executemany
     sample_books = [
-        Book(
+        dict(
             title="Python Programming",
             author="John Smith",
             isbn="978-0-123456-78-9",
@@ -158,7 +452,7 @@ def add_sample_data():
             available_copies=3,
             location="A1-101"
         ),
-        Book(
+        dict(
             title="Data Structures and Algorithms",
             author="Jane Doe",
             isbn="978-0-234567-89-0",
@@ -170,7 +464,7 @@ def add_sample_data():
             available_copies=2,
             location="B2-205"
         ),
-        Book(
+        dict(
             title="Web Development with Flask",
             author="Mike Johnson",
             isbn="978-0-345678-90-1",
@@ -197,13 +491,10 @@ def add_sample_data():
     
     # Add sample data if not exists
     if not Book.query.first():
-        for book in sample_books:
-            db.session.add(book)
+        db.session.execute(db.insert(Book), sample_books)
     
     if not User.query.filter_by(username='student1').first():
-        from werkzeug.security import generate_password_hash
-        sample_student.password_hash = generate_password_hash('student123')
+        sample_student.set_password('student123')
         db.session.add(sample_student)
     
-    db.session.commit()
     print("Sample data added successfully!")
@@ -5,8 +5,8 @@ Handles user login, logout, and session management
 
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_user, logout_user, login_required, current_user
-from werkzeug.security import check_password_hash
-from models.models import db, User
+from models.models import db, User, check_dummy_password
+from sqlalchemy import func
 
 auth_bp = Blueprint('auth', __name__)
 
@@ -26,11 +26,22 @@ def login():
             flash('Please enter both username and password', 'danger')
             return render_template('login.html')
         
-        # Find user
-        user = User.query.filter_by(username=username).first()
+        # Find user (usernames are case-insensitive)
+        user = User.query.filter(
+            func.lower(User.username) == username.strip().lower()
+        ).first()
         
         # Check credentials
-        if user and user.is_active and check_password_hash(user.password_hash, password):
+        if user and user.is_active:
+            valid = user.check_password(password)
+        else:
+            valid = check_dummy_password(password)
+        
+        if valid:
+            # Persist a hash upgraded from the legacy PBKDF2 format
+            if db.session.is_modified(user):
+                db.session.commit()
+            
             login_user(user, remember=remember)
             next_page = request.args.get('next')
             
@@ -71,7 +82,7 @@ def change_password():
             return render_template('change_password.html')
         
         # Check current password
-        if not check_password_hash(current_user.password_hash, current_password):
+        if not current_user.check_password(current_password):
             flash('Current password is incorrect', 'danger')
             return render_template('change_password.html')
         
@@ -81,8 +92,7 @@ def change_password():
             return render_template('change_password.html')
         
         # Update password
-        from werkzeug.security import generate_password_hash
-        current_user.password_hash = generate_password_hash(new_password)
+        current_user.set_password(new_password)
         db.session.commit()
         
         flash('Password changed successfully', 'success')
@@ -5,11 +5,40 @@ Handles CRUD operations for books
 
 from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
 from flask_login import login_required, current_user
-from models.models import db, Book, Transaction
+from models.models import db, Book, Transaction, book_search_filter, keyset_page, query_exists
+from routes.transactions import invalidate_search_cache
+from sqlalchemy import lambda_stmt, select
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from datetime import datetime
+import time
 
 books_bp = Blueprint('books', __name__)
 
+# Categories for the list filter dropdown. They rarely change, so keep them
+# for a minute and drop the cache whenever a book is added or edited.
+CATEGORIES_TTL = 60
+_categories_cache = {'ts': 0, 'value': []}
+
+def _get_categories():
+    """Return the distinct book categories, cached for CATEGORIES_TTL seconds"""
+    now = time.monotonic()
+    if not _categories_cache['ts'] or now - _categories_cache['ts'] > CATEGORIES_TTL:
+        categories = db.session.query(Book.category).filter(Book.category != '').distinct().all()
+        _categories_cache['value'] = [cat[0] for cat in categories]
+        _categories_cache['ts'] = now
+    return _categories_cache['value']
+
+def _invalidate_categories():
+    """Force the next list_books call to reload the categories"""
+    _categories_cache['ts'] = 0
+
+def insert_ignoring_conflicts(model):
+    """Dialect-specific INSERT supporting ON CONFLICT DO NOTHING"""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        return postgresql_insert(model)
+    return sqlite_insert(model)
+
 @books_bp.route('/')
 @login_required
 def list_books():
@@ -22,11 +51,7 @@ def list_books():
     query = Book.query.filter_by(is_active=True)
     
     if search:
-        query = query.filter(
-            Book.title.contains(search) |
-            Book.author.contains(search) |
-            Book.isbn.contains(search)
-        )
+        query = query.filter(book_search_filter(search))
     
     if category:
         query = query.filter_by(category=category)
@@ -37,8 +62,7 @@ def list_books():
     )
     
     # Get categories for filter dropdown
-    categories = db.session.query(Book.category).filter(Book.category != '').distinct().all()
-    categories = [cat[0] for cat in categories]
+    categories = _get_categories()
     
     return render_template('books/list.html', 
                          books=books, 
@@ -71,28 +95,30 @@ def add_book():
             flash('Title, Author, and ISBN are required', 'danger')
             return render_template('books/add.html')
         
-        # Check if ISBN already exists
-        existing_book = Book.query.filter_by(isbn=isbn).first()
-        if existing_book:
+        # Insert the book unless its ISBN is taken, in one statement; no
+        # returned id means the ISBN already exists
+        book_id = db.session.execute(
+            insert_ignoring_conflicts(Book).values(
+                title=title,
+                author=author,
+                isbn=isbn,
+                publisher=publisher,
+                publication_year=publication_year if publication_year else None,
+                category=category,
+                description=description,
+                total_copies=total_copies if total_copies else 1,
+                available_copies=total_copies if total_copies else 1,
+                location=location
+            ).on_conflict_do_nothing(index_elements=['isbn']).returning(Book.id)
+        ).scalar()
+        db.session.commit()
+        
+        if book_id is None:
             flash('A book with this ISBN already exists', 'danger')
             return render_template('books/add.html')
         
-        # Create new book
-        book = Book(
-            title=title,
-            author=author,
-            isbn=isbn,
-            publisher=publisher,
-            publication_year=publication_year if publication_year else None,
-            category=category,
-            description=description,
-            total_copies=total_copies if total_copies else 1,
-            available_copies=total_copies if total_copies else 1,
-            location=location
-        )
-        
-        db.session.add(book)
-        db.session.commit()
+        _invalidate_categories()
+        invalidate_search_cache()
         
         flash(f'Book "{title}" added successfully', 'success')
         return redirect(url_for('books.list_books'))
@@ -103,12 +129,14 @@ def add_book():
 @login_required
 def view_book(book_id):
     """View book details"""
-    book = Book.query.get_or_404(book_id)
+    book = db.get_or_404(Book, book_id)
     
-    # Get transaction history for this book
-    transactions = Transaction.query.filter_by(book_id=book_id).order_by(
-        Transaction.created_at.desc()
-    ).limit(10).all()
+    # Get transaction history for this book. lambda_stmt caches the
+    # constructed statement, so only book_id is re-bound per request
+    transactions = db.session.scalars(lambda_stmt(
+        lambda: select(Transaction).where(Transaction.book_id == book_id)
+        .order_by(Transaction.created_at.desc()).limit(10)
+    )).all()
     
     return render_template('books/view.html', book=book, transactions=transactions)
 
@@ -120,7 +148,7 @@ def edit_book(book_id):
         flash('Only administrators can edit books', 'danger')
         return redirect(url_for('books.view_book', book_id=book_id))
     
-    book = Book.query.get_or_404(book_id)
+    book = db.get_or_404(Book, book_id)
     
     if request.method == 'POST':
         # Get form data
@@ -140,8 +168,7 @@ def edit_book(book_id):
             return render_template('books/edit.html', book=book)
         
         # Check if ISBN already exists (excluding current book)
-        existing_book = Book.query.filter(Book.isbn == isbn, Book.id != book_id).first()
-        if existing_book:
+        if query_exists(Book.query.filter(Book.isbn == isbn, Book.id != book_id)):
             flash('A book with this ISBN already exists', 'danger')
             return render_template('books/edit.html', book=book)
         
@@ -166,6 +193,8 @@ def edit_book(book_id):
             book.available_copies = max(0, total_copies - issued_copies)
         
         db.session.commit()
+        _invalidate_categories()
+        invalidate_search_cache()
         
         flash(f'Book "{title}" updated successfully', 'success')
         return redirect(url_for('books.view_book', book_id=book_id))
@@ -180,20 +209,22 @@ def delete_book(book_id):
         flash('Only administrators can delete books', 'danger')
         return redirect(url_for('books.view_book', book_id=book_id))
     
-    book = Book.query.get_or_404(book_id)
+    book = db.get_or_404(Book, book_id)
     
     # Check if book has any active transactions
-    active_transactions = Transaction.query.filter_by(
+    # (EXISTS stops at the first match instead of counting them all)
+    has_active_transactions = query_exists(Transaction.query.filter_by(
         book_id=book_id, status='issued'
-    ).count()
+    ))
     
-    if active_transactions > 0:
+    if has_active_transactions:
         flash('Cannot delete book with active transactions', 'danger')
         return redirect(url_for('books.view_book', book_id=book_id))
     
     # Soft delete (mark as inactive)
     book.is_active = False
     db.session.commit()
+    invalidate_search_cache()
     
     flash(f'Book "{book.title}" deleted successfully', 'success')
     return redirect(url_for('books.list_books'))
@@ -203,23 +234,19 @@ def delete_book(book_id):
 def search_books():
     """AJAX search for books"""
     query = request.args.get('q', '')
+    after = request.args.get('after')
     
     if len(query) < 2:
-        return jsonify([])
-    
-    books = Book.query.filter(
+        return jsonify(results=[], next_cursor=None)
+    
+    # Only the JSON fields are selected, so no ORM objects are built.
+    # Same response shape as the transactions autocomplete: "More results"
+    # passes next_cursor back as ?after= to seek past the last (title, id)
+    books, next_cursor = keyset_page(db.session.query(
+        Book.id, Book.title, Book.author, Book.isbn, (Book.available_copies > 0).label('available')
+    ).filter(
         Book.is_active == True,
-        Book.title.contains(query) | Book.author.contains(query) | Book.isbn.contains(query)
-    ).limit(10).all()
-    
-    results = []
-    for book in books:
-        results.append({
-            'id': book.id,
-            'title': book.title,
-            'author': book.author,
-            'isbn': book.isbn,
-            'available': book.available_copies > 0
-        })
-    
-    return jsonify(results)
+        book_search_filter(query, prefix=True)
+    ), [Book.title, Book.id], after, per_page=10, descending=False)
+    
+    return jsonify(results=[book._asdict() for book in books], next_cursor=next_cursor)
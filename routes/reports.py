@@ -3,15 +3,34 @@ Reports Routes
 Handles various reports for library management
 """
 
-from flask import Blueprint, render_template, request, make_response, flash, redirect, url_for
+from flask import Blueprint, render_template, request, Response, stream_with_context, flash, redirect, url_for
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
 from models.models import db, Book, Transaction, Fine, User
+from sqlalchemy import Integer, and_, case, cast, distinct, func, select
+from sqlalchemy.orm import joinedload
 import csv
 from io import StringIO
 
 reports_bp = Blueprint('reports', __name__)
 
+# CSV exports fetch rows in batches and send them in chunks of about 64 KB
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# Rows per page on the on-screen reports (exports are not paginated)
+REPORT_PAGE_SIZE = 50
+
+def days_overdue_column(now):
+    """SQL equivalent of Transaction.days_overdue() as of `now`"""
+    seconds_late = (cast(func.strftime('%s', now), Integer) -
+                    cast(func.strftime('%s', Transaction.due_date), Integer))
+    return case(
+        (and_(Transaction.return_date == None, Transaction.due_date < now),
+         seconds_late // 86400),
+        else_=0
+    ).label('days_overdue')
+
 @reports_bp.route('/')
 @login_required
 def dashboard():
@@ -22,17 +41,22 @@ def dashboard():
 @login_required
 def issued_books():
     """Report of currently issued books"""
+    page = request.args.get('page', 1, type=int)
+    
     # Get issued transactions
-    transactions = Transaction.query.filter_by(status='issued').order_by(
+    pagination = Transaction.query.options(
+        joinedload(Transaction.user), joinedload(Transaction.book)
+    ).filter_by(status='issued').order_by(
         Transaction.issue_date.desc()
-    ).all()
+    ).paginate(page=page, per_page=REPORT_PAGE_SIZE, error_out=False)
     
     # Statistics
-    total_issued = len(transactions)
+    total_issued = pagination.total
     overdue_count = Transaction.query.filter_by(status='overdue').count()
     
     return render_template('reports/issued_books.html', 
-                         transactions=transactions,
+                         transactions=pagination.items,
+                         pagination=pagination,
                          total_issued=total_issued,
                          overdue_count=overdue_count)
 
@@ -40,17 +64,22 @@ def issued_books():
 @login_required
 def available_books():
     """Report of available books"""
+    page = request.args.get('page', 1, type=int)
+    
     # Get available books
-    books = Book.query.filter_by(is_active=True).filter(
+    pagination = Book.query.filter_by(is_active=True).filter(
         Book.available_copies > 0
-    ).order_by(Book.title).all()
+    ).order_by(Book.title).paginate(page=page, per_page=REPORT_PAGE_SIZE, error_out=False)
     
     # Statistics
-    total_available = len(books)
-    low_stock = [book for book in books if book.available_copies <= 1]
+    total_available = pagination.total
+    low_stock = Book.query.filter_by(is_active=True).filter(
+        Book.available_copies == 1
+    ).order_by(Book.title).all()
     
     return render_template('reports/available_books.html',
-                         books=books,
+                         books=pagination.items,
+                         pagination=pagination,
                          total_available=total_available,
                          low_stock=low_stock)
 
@@ -58,18 +87,33 @@ def available_books():
 @login_required
 def overdue_books_report():
     """Report of overdue books"""
-    # Get overdue transactions
-    overdue_transactions = Transaction.query.filter(
+    page = request.args.get('page', 1, type=int)
+    now = datetime.utcnow()
+    is_overdue = and_(
         Transaction.status.in_(['issued', 'overdue']),
-        Transaction.due_date < datetime.utcnow()
-    ).order_by(Transaction.due_date).all()
+        Transaction.due_date < now
+    )
+    
+    # Get overdue transactions with days overdue computed by the database
+    pagination = db.session.query(Transaction, days_overdue_column(now)).options(
+        joinedload(Transaction.user), joinedload(Transaction.book)
+    ).filter(is_overdue).order_by(
+        Transaction.due_date
+    ).paginate(page=page, per_page=REPORT_PAGE_SIZE, error_out=False)
     
-    # Calculate statistics
-    total_overdue = len(overdue_transactions)
-    total_fines = sum(t.days_overdue() for t in overdue_transactions)
+    overdue_transactions = [t for t, _ in pagination.items]
+    days_overdue = {t.id: days for t, days in pagination.items}
+    
+    # Calculate statistics over every overdue transaction, not just this page
+    total_overdue = pagination.total
+    total_fines = db.session.query(
+        func.coalesce(func.sum(days_overdue_column(now)), 0)
+    ).filter(is_overdue).scalar()
     
     return render_template('reports/overdue_books.html',
                          transactions=overdue_transactions,
+                         pagination=pagination,
+                         days_overdue=days_overdue,
                          total_overdue=total_overdue,
                          total_fines=total_fines)
 
@@ -77,17 +121,28 @@ def overdue_books_report():
 @login_required
 def fines_report():
     """Report of fines"""
+    page = request.args.get('page', 1, type=int)
+    
     # Get fines
-    fines = Fine.query.order_by(Fine.created_at.desc()).all()
+    pagination = Fine.query.order_by(Fine.created_at.desc()).paginate(
+        page=page, per_page=REPORT_PAGE_SIZE, error_out=False
+    )
     
-    # Statistics
-    total_fines = len(fines)
-    unpaid_fines = Fine.query.filter_by(status='unpaid').count()
-    total_amount = sum(f.total_amount for f in fines)
-    unpaid_amount = sum(f.remaining_amount() for f in fines if f.status == 'unpaid')
+    # Statistics, aggregated in a single query
+    is_unpaid = Fine.status == 'unpaid'
+    total_fines, unpaid_fines, total_amount, unpaid_amount = db.session.query(
+        func.count(Fine.id),
+        func.coalesce(func.sum(case((is_unpaid, 1), else_=0)), 0),
+        func.coalesce(func.sum(Fine.total_amount), 0),
+        func.coalesce(func.sum(case(
+            (is_unpaid, Fine.remaining_amount),
+            else_=0
+        )), 0)
+    ).one()
     
     return render_template('reports/fines.html',
-                         fines=fines,
+                         fines=pagination.items,
+                         pagination=pagination,
                          total_fines=total_fines,
                          unpaid_fines=unpaid_fines,
                          total_amount=total_amount,
@@ -97,77 +152,77 @@ def fines_report():
 @login_required
 def user_activity():
     """Report of user activity"""
-    # Get users with their transaction counts
-    users = User.query.filter_by(is_active=True).all()
+    page = request.args.get('page', 1, type=int)
+    now = datetime.utcnow()
     
-    user_stats = []
-    for user in users:
-        total_transactions = Transaction.query.filter_by(user_id=user.id).count()
-        active_transactions = Transaction.query.filter_by(
-            user_id=user.id, status='issued'
-        ).count()
-        overdue_transactions = Transaction.query.filter(
-            Transaction.user_id == user.id,
+    # Get users with their transaction counts in one grouped query
+    total_transactions = func.count(Transaction.id)
+    pagination = db.session.query(
+        User,
+        total_transactions,
+        func.sum(case((Transaction.status == 'issued', 1), else_=0)),
+        func.sum(case((and_(
             Transaction.status.in_(['issued', 'overdue']),
-            Transaction.due_date < datetime.utcnow()
-        ).count()
-        
-        user_stats.append({
-            'user': user,
-            'total_transactions': total_transactions,
-            'active_transactions': active_transactions,
-            'overdue_transactions': overdue_transactions
-        })
+            Transaction.due_date < now
+        ), 1), else_=0))
+    ).outerjoin(User.transactions).filter(
+        User.is_active == True
+    ).group_by(User.id).order_by(
+        total_transactions.desc(), User.id
+    ).paginate(page=page, per_page=REPORT_PAGE_SIZE, error_out=False)
     
-    # Sort by total transactions
-    user_stats.sort(key=lambda x: x['total_transactions'], reverse=True)
+    user_stats = [{
+        'user': user,
+        'total_transactions': total,
+        'active_transactions': active,
+        'overdue_transactions': overdue
+    } for user, total, active, overdue in pagination.items]
     
-    return render_template('reports/user_activity.html', user_stats=user_stats)
+    return render_template('reports/user_activity.html',
+                         user_stats=user_stats,
+                         pagination=pagination)
 
 @reports_bp.route('/book_statistics')
 @login_required
 def book_statistics():
     """Report of book statistics"""
-    # Get all books
-    books = Book.query.filter_by(is_active=True).all()
-    
-    book_stats = []
-    for book in books:
-        total_transactions = Transaction.query.filter_by(book_id=book.id).count()
-        current_issues = Transaction.query.filter_by(
-            book_id=book.id, status='issued'
-        ).count()
-        
-        book_stats.append({
-            'book': book,
-            'total_transactions': total_transactions,
-            'current_issues': current_issues,
-            'popularity': total_transactions
-        })
-    
-    # Sort by popularity
-    book_stats.sort(key=lambda x: x['popularity'], reverse=True)
+    # Per-book transaction counts in one grouped query
+    total_transactions = func.count(Transaction.id)
+    rows = db.session.query(
+        Book,
+        total_transactions,
+        func.sum(case((Transaction.status == 'issued', 1), else_=0))
+    ).outerjoin(Book.transactions).filter(
+        Book.is_active == True
+    ).group_by(Book.id).order_by(
+        total_transactions.desc(), Book.id
+    ).all()
     
-    # Category statistics
-    categories = db.session.query(Book.category).filter(Book.category != '').distinct().all()
-    category_stats = []
+    book_stats = [{
+        'book': book,
+        'total_transactions': total,
+        'current_issues': current,
+        'popularity': total
+    } for book, total, current in rows]
     
-    for category in categories:
-        cat_name = category[0]
-        books_in_category = Book.query.filter_by(category=cat_name, is_active=True).all()
-        total_books = len(books_in_category)
-        total_transactions = sum(
-            Transaction.query.filter_by(book_id=book.id).count()
-            for book in books_in_category
-        )
-        
-        category_stats.append({
-            'category': cat_name,
-            'total_books': total_books,
-            'total_transactions': total_transactions
-        })
+    # Category statistics, counting only active books (categories whose
+    # books are all inactive still show up with zero counts)
+    category_transactions = func.count(case((Book.is_active == True, Transaction.id)))
+    rows = db.session.query(
+        Book.category,
+        func.count(distinct(case((Book.is_active == True, Book.id)))),
+        category_transactions
+    ).outerjoin(Book.transactions).filter(
+        Book.category != ''
+    ).group_by(Book.category).order_by(
+        category_transactions.desc(), Book.category
+    ).all()
     
-    category_stats.sort(key=lambda x: x['total_transactions'], reverse=True)
+    category_stats = [{
+        'category': cat_name,
+        'total_books': total_books,
+        'total_transactions': total
+    } for cat_name, total_books, total in rows]
     
     return render_template('reports/book_statistics.html',
                          book_stats=book_stats,
@@ -179,81 +234,75 @@ def export_report(report_type):
     """Export report to CSV"""
     
     if report_type == 'issued_books':
-        transactions = Transaction.query.filter_by(status='issued').all()
-        
-        output = StringIO()
-        writer = csv.writer(output)
+        now = datetime.utcnow()
+        transactions = Transaction.query.options(
+            joinedload(Transaction.user), joinedload(Transaction.book)
+        ).filter_by(status='issued').yield_per(EXPORT_BATCH_SIZE)
         
         # Header
-        writer.writerow(['Transaction ID', 'User', 'Book Title', 'Author', 
-                        'Issue Date', 'Due Date', 'Days Overdue'])
+        header = ['Transaction ID', 'User', 'Book Title', 'Author',
+                  'Issue Date', 'Due Date', 'Days Overdue']
         
         # Data
-        for t in transactions:
-            writer.writerow([
-                t.id,
-                t.user.full_name,
-                t.book.title,
-                t.book.author,
-                t.issue_date.strftime('%Y-%m-%d'),
-                t.due_date.strftime('%Y-%m-%d'),
-                t.days_overdue()
-            ])
+        rows = ([
+            t.id,
+            t.user.full_name,
+            t.book.title,
+            t.book.author,
+            t.issue_date.strftime('%Y-%m-%d'),
+            t.due_date.strftime('%Y-%m-%d'),
+            t.days_overdue(now)
+        ] for t in transactions)
         
         filename = f'issued_books_{datetime.now().strftime("%Y%m%d")}.csv'
         
     elif report_type == 'overdue_books':
-        transactions = Transaction.query.filter(
+        now = datetime.utcnow()
+        transactions = db.session.query(Transaction, days_overdue_column(now)).options(
+            joinedload(Transaction.user), joinedload(Transaction.book)
+        ).filter(
             Transaction.status.in_(['issued', 'overdue']),
-            Transaction.due_date < datetime.utcnow()
-        ).all()
-        
-        output = StringIO()
-        writer = csv.writer(output)
+            Transaction.due_date < now
+        ).yield_per(EXPORT_BATCH_SIZE)
         
         # Header
-        writer.writerow(['Transaction ID', 'User', 'Book Title', 'Author',
-                        'Issue Date', 'Due Date', 'Days Overdue', 'Fine Amount'])
+        header = ['Transaction ID', 'User', 'Book Title', 'Author',
+                  'Issue Date', 'Due Date', 'Days Overdue', 'Fine Amount']
         
-        # Data
-        for t in transactions:
-            days_overdue = t.days_overdue()
-            fine_amount = days_overdue * 1.0  # $1 per day
-            
-            writer.writerow([
-                t.id,
-                t.user.full_name,
-                t.book.title,
-                t.book.author,
-                t.issue_date.strftime('%Y-%m-%d'),
-                t.due_date.strftime('%Y-%m-%d'),
-                days_overdue,
-                f'₹{fine_amount:.2f}'
-            ])
+        # Data ($1 per day fine)
+        rows = ([
+            t.id,
+            t.user.full_name,
+            t.book.title,
+            t.book.author,
+            t.issue_date.strftime('%Y-%m-%d'),
+            t.due_date.strftime('%Y-%m-%d'),
+            days_overdue,
+            f'₹{days_overdue * 1.0:.2f}'
+        ] for t, days_overdue in transactions)
         
         filename = f'overdue_books_{datetime.now().strftime("%Y%m%d")}.csv'
         
     elif report_type == 'fines':
-        fines = Fine.query.all()
-        
-        output = StringIO()
-        writer = csv.writer(output)
+        fines = Fine.query.options(
+            joinedload(Fine.transaction).joinedload(Transaction.user),
+            joinedload(Fine.transaction).joinedload(Transaction.book)
+        ).yield_per(EXPORT_BATCH_SIZE)
         
         # Header
-        writer.writerow(['Fine ID', 'User', 'Book Title', 'Days Late',
-                        'Total Amount', 'Paid Amount', 'Status'])
+        header = ['Fine ID', 'User', 'Book Title', 'Days Late',
+                  'Total Amount', 'Paid Amount', 'Status']
         
         # Data
-        for fine in fines:
-            writer.writerow([
-                fine.id,
-                fine.transaction.user.full_name,
-                fine.transaction.book.title,
-                fine.days_late,
-                f'₹{fine.total_amount:.2f}',
-                f'₹{fine.paid_amount:.2f}',
-                fine.status
-            ])
+        rows = ([
+            fine.id,
+            fine.transaction.user.full_name,
+            fine.transaction.book.title,
+            fine.days_late,
+            f'₹{fine.total_amount:.2f}',
+            f'₹{fine.paid_amount:.2f}',
+            fine.status
+        ] for fine in fines)
         
         filename = f'fines_{datetime.now().strftime("%Y%m%d")}.csv'
         
@@ -261,13 +310,26 @@ def export_report(report_type):
         flash('Invalid report type', 'danger')
         return redirect(url_for('reports.dashboard'))
     
-    # Create response
-    output.seek(0)
-    response = make_response(output.getvalue())
-    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
-    response.headers['Content-type'] = 'text/csv'
+    # Stream the response so rows go out as they are fetched instead of
+    # building the whole file in memory first
+    return Response(stream_with_context(generate_csv(header, rows)),
+                    mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+def generate_csv(header, rows):
+    """Yield CSV text in chunks of roughly EXPORT_CHUNK_SIZE characters"""
+    output = StringIO()
+    writer = csv.writer(output)
+    writer.writerow(header)
+    
+    for row in rows:
+        writer.writerow(row)
+        if output.tell() >= EXPORT_CHUNK_SIZE:
+            yield output.getvalue()
+            output.seek(0)
+            output.truncate()
     
-    return response
+    yield output.getvalue()
 
 @reports_bp.route('/daily_summary')
 @login_required
@@ -278,26 +340,13 @@ def daily_summary():
     today_start = datetime.combine(today, datetime.min.time())
     today_end = datetime.combine(today, datetime.max.time())
     
-    # Today's statistics
-    books_issued_today = Transaction.query.filter(
-        Transaction.issue_date >= today_start,
-        Transaction.issue_date <= today_end
-    ).count()
-    
-    books_returned_today = Transaction.query.filter(
-        Transaction.return_date >= today_start,
-        Transaction.return_date <= today_end
-    ).count()
-    
-    new_users_today = User.query.filter(
-        User.created_at >= today_start,
-        User.created_at <= today_end
-    ).count()
-    
-    fines_created_today = Fine.query.filter(
-        Fine.created_at >= today_start,
-        Fine.created_at <= today_end
-    ).count()
+    # Today's statistics, counted in a single round trip; each count is a
+    # range scan on an indexed timestamp column
+    books_issued_today, books_returned_today, new_users_today, fines_created_today = db.session.query(*(
+        select(func.count()).where(column >= today_start, column <= today_end).scalar_subquery()
+        for column in (Transaction.issue_date, Transaction.return_date,
+                       User.created_at, Fine.created_at)
+    )).one()
     
     # Recent activity
     recent_transactions = Transaction.query.filter(
@@ -3,23 +3,104 @@ Transaction Management Routes
 Handles book issue, return, and transaction management
 """
 
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, abort, Response
 from flask_login import login_required, current_user
 from datetime import datetime, timedelta
-from models.models import db, Book, Transaction, Fine, User
+from models.models import db, Book, Transaction, Fine, User, keyset_page, book_search_filter, user_search_filter
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.orm import joinedload
+import json
+import threading
+import time
 
 transactions_bp = Blueprint('transactions', __name__)
 
+# Autocomplete results, as serialized JSON keyed by (endpoint, query, cursor).
+# Typing repeats the same prefixes within seconds, so keep each result for
+# a short while; any book, user or loan change clears the whole cache.
+SEARCH_CACHE_TTL = 30
+SEARCH_CACHE_SIZE = 512
+_search_cache = {}
+_search_cache_lock = threading.Lock()
+
+def _cached_search(key, search):
+    """Return search()'s page of rows as JSON, from the cache when still fresh
+    
+    search() returns (rows, next_cursor), as keyset_page does.
+    """
+    now = time.monotonic()
+    with _search_cache_lock:
+        entry = _search_cache.get(key)
+    if entry and now - entry[0] <= SEARCH_CACHE_TTL:
+        return entry[1]
+    
+    rows, next_cursor = search()
+    body = json.dumps({
+        'results': [row._asdict() for row in rows],
+        'next_cursor': next_cursor
+    })
+    # Locked so concurrent requests and invalidate_search_cache() cannot
+    # empty the cache between the size check and the eviction
+    with _search_cache_lock:
+        if len(_search_cache) >= SEARCH_CACHE_SIZE:
+            # Drop the oldest entry (dicts keep insertion order)
+            _search_cache.pop(next(iter(_search_cache)))
+        _search_cache.pop(key, None)
+        _search_cache[key] = (now, body)
+    return body
+
+def invalidate_search_cache():
+    """Forget cached autocomplete results after books, users or loans change"""
+    with _search_cache_lock:
+        _search_cache.clear()
+
+# Most overdue loans rendered on one page of the overdue list
+OVERDUE_PAGE_SIZE = 500
+
+# Per-user transaction totals for profile pages, keyed by user id. They
+# only change when a book is issued, so keep them for a minute and drop a
+# user's entry when they borrow.
+USER_STATS_TTL = 60
+_user_stats_cache = {}
+
+def user_transaction_count(user_id):
+    """Return how many transactions user_id has, cached for USER_STATS_TTL seconds"""
+    now = time.monotonic()
+    entry = _user_stats_cache.get(user_id)
+    if entry and now - entry[0] <= USER_STATS_TTL:
+        return entry[1]
+    
+    total = db.session.query(func.count(Transaction.id)).filter(
+        Transaction.user_id == user_id
+    ).scalar()
+    _user_stats_cache[user_id] = (now, total)
+    return total
+
+def invalidate_user_stats(user_id):
+    """Forget a user's cached totals after their transactions change"""
+    _user_stats_cache.pop(int(user_id), None)
+
+def get_transaction_or_404(transaction_id):
+    """Load a transaction together with its book and user, or abort with 404"""
+    transaction = db.session.get(Transaction, transaction_id, options=[
+        joinedload(Transaction.book), joinedload(Transaction.user)
+    ])
+    if transaction is None:
+        abort(404)
+    return transaction
+
 @transactions_bp.route('/')
 @login_required
 def list_transactions():
     """Display list of all transactions"""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     status = request.args.get('status', '')
     user_id = request.args.get('user_id', '')
     
-    # Build query
-    query = Transaction.query
+    # Build query (book and user are shown on every row, so join them in)
+    query = Transaction.query.options(
+        joinedload(Transaction.book), joinedload(Transaction.user)
+    )
     
     # Filter by status
     if status:
@@ -32,21 +113,23 @@ def list_transactions():
         # Students can only see their own transactions
         query = query.filter_by(user_id=current_user.id)
     
-    # Pagination
-    transactions = query.order_by(Transaction.created_at.desc()).paginate(
-        page=page, per_page=10, error_out=False
+    # Pagination (newest first)
+    transactions, next_cursor = keyset_page(
+        query, [Transaction.created_at, Transaction.id], cursor, per_page=10
     )
     
-    # Get users for filter dropdown (admin only)
-    users = []
-    if current_user.user_type == 'admin':
-        users = User.query.filter_by(is_active=True).order_by(User.full_name).all()
+    # The user filter is filled in through search_users as the admin types;
+    # only the currently selected user is needed to render it
+    selected_user = None
+    if current_user.user_type == 'admin' and user_id:
+        selected_user = db.session.get(User, user_id)
     
     return render_template('transactions/list.html', 
                          transactions=transactions, 
+                         next_cursor=next_cursor,
                          status=status,
                          user_id=user_id,
-                         users=users)
+                         selected_user=selected_user)
 
 @transactions_bp.route('/issue', methods=['GET', 'POST'])
 @login_required
@@ -63,30 +146,55 @@ def issue_book():
             flash('Book and User are required', 'danger')
             return render_template('transactions/issue.html')
         
-        # Get book and user
-        book = Book.query.get_or_404(book_id)
-        user = User.query.get_or_404(user_id)
+        # Look up the book, the user and any copy of this book they already
+        # have issued in one round trip
+        row = db.session.query(
+            Book.title,
+            User.full_name,
+            User.is_active,
+            Transaction.query.filter_by(
+                user_id=user_id,
+                book_id=book_id,
+                status='issued'
+            ).exists().label('already_issued')
+        ).select_from(Book).join(User, User.id == user_id).filter(Book.id == book_id).first()
         
-        # Check if book is available
-        if not book.is_available():
-            flash('Book is not available for issue', 'danger')
+        if row is None:
+            abort(404)
+        
+        if not row.is_active:
+            flash('Cannot issue books to an inactive user', 'danger')
             return render_template('transactions/issue.html')
         
         # Check if user already has this book issued
-        existing_transaction = Transaction.query.filter_by(
-            user_id=user_id, 
-            book_id=book_id, 
-            status='issued'
-        ).first()
-        
-        if existing_transaction:
+        if row.already_issued:
             flash('User already has this book issued', 'danger')
             return render_template('transactions/issue.html')
         
+        # Take a copy only if one is left; the check and the decrement are a
+        # single UPDATE, so concurrent issues cannot both get the last copy
+        reserved = db.session.execute(
+            update(Book).where(
+                Book.id == book_id,
+                Book.is_active == True,
+                Book.available_copies > 0
+            ).values(available_copies=Book.available_copies - 1)
+        ).rowcount
+        
+        if not reserved:
+            flash('Book is not available for issue', 'danger')
+            return render_template('transactions/issue.html')
+        
         # Set default due days
         if not due_days or due_days <= 0:
             due_days = 14  # Default 2 weeks
         
+        # Count the loan against the user in the same transaction
+        db.session.execute(
+            update(User).where(User.id == user_id)
+            .values(active_loans=User.active_loans + 1)
+        )
+        
         # Create transaction
         transaction = Transaction(
             user_id=user_id,
@@ -96,26 +204,40 @@ def issue_book():
             status='issued'
         )
         
-        # Update book availability
-        book.available_copies -= 1
-        
         db.session.add(transaction)
         db.session.commit()
+        invalidate_search_cache()
+        invalidate_user_stats(user_id)
         
-        flash(f'Book "{book.title}" issued to {user.full_name} successfully', 'success')
+        flash(f'Book "{row.title}" issued to {row.full_name} successfully', 'success')
         return redirect(url_for('transactions.view_transaction', transaction_id=transaction.id))
     
-    # Get available books and active users
-    books = Book.query.filter_by(is_active=True).filter(Book.available_copies > 0).order_by(Book.title).all()
-    users = User.query.filter_by(is_active=True).order_by(User.full_name).all()
+    # The page only lists the first 10 available books and active users
+    # (the search boxes find the rest), plus how many there are in total
+    book_available = and_(Book.is_active == True, Book.available_copies > 0)
+    books = db.session.query(
+        Book.id, Book.title, Book.author, Book.available_copies
+    ).filter(book_available).order_by(Book.title).limit(10).all()
+    users = db.session.query(
+        User.id, User.full_name, User.username, User.user_type
+    ).filter(User.is_active == True).order_by(User.full_name).limit(10).all()
     
-    return render_template('transactions/issue.html', books=books, users=users)
+    total_books, total_users = db.session.query(
+        select(func.count(Book.id)).where(book_available).scalar_subquery(),
+        select(func.count(User.id)).where(User.is_active == True).scalar_subquery()
+    ).one()
+    
+    return render_template('transactions/issue.html',
+                         books=books,
+                         users=users,
+                         total_books=total_books,
+                         total_users=total_users)
 
 @transactions_bp.route('/<int:transaction_id>')
 @login_required
 def view_transaction(transaction_id):
     """View transaction details"""
-    transaction = Transaction.query.get_or_404(transaction_id)
+    transaction = get_transaction_or_404(transaction_id)
     
     # Check permissions
     if current_user.user_type != 'admin' and transaction.user_id != current_user.id:
@@ -128,7 +250,7 @@ def view_transaction(transaction_id):
 @login_required
 def return_book(transaction_id):
     """Return an issued book"""
-    transaction = Transaction.query.get_or_404(transaction_id)
+    transaction = get_transaction_or_404(transaction_id)
     
     # Check if book is already returned
     if transaction.status == 'returned':
@@ -136,17 +258,37 @@ def return_book(transaction_id):
         return redirect(url_for('transactions.view_transaction', transaction_id=transaction_id))
     
     if request.method == 'POST':
-        # Update transaction
-        transaction.return_date = datetime.utcnow()
-        transaction.status = 'returned'
+        # One reference time for the return date and the fine, measured
+        # before return_date is set (a returned loan is never overdue)
+        now = datetime.utcnow()
+        days_late = transaction.days_overdue(now)
+        
+        # Mark the loan returned only if it still is out; the check and the
+        # update are a single UPDATE, so concurrent returns cannot both pass
+        returned = db.session.execute(
+            update(Transaction).where(
+                Transaction.id == transaction_id,
+                Transaction.status != 'returned'
+            ).values(return_date=now, status='returned')
+        ).rowcount
         
-        # Update book availability
-        book = Book.query.get(transaction.book_id)
-        book.available_copies += 1
+        if not returned:
+            db.session.rollback()
+            flash('This book has already been returned', 'warning')
+            return redirect(url_for('transactions.view_transaction', transaction_id=transaction_id))
+        
+        # Update book availability and the user's loan count
+        db.session.execute(
+            update(Book).where(Book.id == transaction.book_id)
+            .values(available_copies=Book.available_copies + 1)
+        )
+        db.session.execute(
+            update(User).where(User.id == transaction.user_id)
+            .values(active_loans=User.active_loans - 1)
+        )
         
         # Calculate fine if overdue
-        if transaction.is_overdue():
-            days_late = transaction.days_overdue()
+        if days_late:
             fine_rate = 1.0  # $1 per day (can be made configurable)
             total_fine = days_late * fine_rate
             
@@ -166,6 +308,7 @@ def return_book(transaction_id):
             flash('Book returned successfully', 'success')
         
         db.session.commit()
+        invalidate_search_cache()
         return redirect(url_for('transactions.view_transaction', transaction_id=transaction_id))
     
     return render_template('transactions/return.html', transaction=transaction)
@@ -174,7 +317,7 @@ def return_book(transaction_id):
 @login_required
 def renew_book(transaction_id):
     """Renew an issued book"""
-    transaction = Transaction.query.get_or_404(transaction_id)
+    transaction = get_transaction_or_404(transaction_id)
     
     # Check if book is already returned
     if transaction.status == 'returned':
@@ -209,73 +352,78 @@ def renew_book(transaction_id):
 @login_required
 def overdue_books():
     """Display list of overdue books"""
-    # Get overdue transactions
-    overdue_transactions = Transaction.query.filter(
-        Transaction.status == 'issued',
-        Transaction.due_date < datetime.utcnow()
-    ).order_by(Transaction.due_date).all()
-    
-    # Update status to overdue
-    for transaction in overdue_transactions:
-        if transaction.status != 'overdue':
-            transaction.status = 'overdue'
+    cursor = request.args.get('cursor')
+    now = datetime.utcnow()
     
+    # Mark issued books past their due date as overdue, in one UPDATE
+    db.session.execute(
+        update(Transaction).where(
+            Transaction.status == 'issued',
+            Transaction.due_date < now
+        ).values(status='overdue')
+    )
     db.session.commit()
     
-    return render_template('transactions/overdue.html', transactions=overdue_transactions)
+    # Get overdue transactions, against the same `now` so the list matches
+    # the rows just updated and the (status, due_date) index serves both.
+    # At most OVERDUE_PAGE_SIZE are loaded; next_cursor fetches the rest
+    overdue_transactions, next_cursor = keyset_page(Transaction.query.options(
+        joinedload(Transaction.book), joinedload(Transaction.user)
+    ).filter(
+        Transaction.status == 'overdue',
+        Transaction.due_date < now
+    ), [Transaction.due_date, Transaction.id], cursor, per_page=OVERDUE_PAGE_SIZE, descending=False)
+    
+    return render_template('transactions/overdue.html',
+                         transactions=overdue_transactions,
+                         next_cursor=next_cursor)
 
 @transactions_bp.route('/search_books')
 @login_required
 def search_books():
     """AJAX search for available books"""
     query = request.args.get('q', '')
+    after = request.args.get('after')
     
     if len(query) < 2:
-        return jsonify([])
+        return jsonify(results=[], next_cursor=None)
     
-    books = Book.query.filter(
-        Book.is_active == True,
-        Book.available_copies > 0,
-        Book.title.contains(query) | Book.author.contains(query) | Book.isbn.contains(query)
-    ).limit(10).all()
+    # Only the JSON fields are selected, so no ORM objects are built.
+    # "More results" passes next_cursor back as ?after= to seek past the
+    # last (title, id) instead of re-running with a bigger LIMIT
+    def search():
+        return keyset_page(db.session.query(
+            Book.id, Book.title, Book.author, Book.isbn, Book.available_copies
+        ).filter(
+            Book.is_active == True,
+            Book.available_copies > 0,
+            book_search_filter(query, prefix=True)
+        ), [Book.title, Book.id], after, per_page=10, descending=False)
     
-    results = []
-    for book in books:
-        results.append({
-            'id': book.id,
-            'title': book.title,
-            'author': book.author,
-            'isbn': book.isbn,
-            'available_copies': book.available_copies
-        })
-    
-    return jsonify(results)
+    return Response(_cached_search(('books', query, after), search), mimetype='application/json')
 
 @transactions_bp.route('/search_users')
 @login_required
 def search_users():
     """AJAX search for users (admin only)"""
     if current_user.user_type != 'admin':
-        return jsonify([])
+        return jsonify(results=[], next_cursor=None)
     
     query = request.args.get('q', '')
+    after = request.args.get('after')
     
     if len(query) < 2:
-        return jsonify([])
-    
-    users = User.query.filter(
-        User.is_active == True,
-        User.full_name.contains(query) | User.username.contains(query) | User.email.contains(query)
-    ).limit(10).all()
+        return jsonify(results=[], next_cursor=None)
     
-    results = []
-    for user in users:
-        results.append({
-            'id': user.id,
-            'full_name': user.full_name,
-            'username': user.username,
-            'email': user.email,
-            'user_type': user.user_type
-        })
+    # Only the JSON fields are selected, so no ORM objects are built.
+    # "More results" passes next_cursor back as ?after= to seek past the
+    # last (full_name, id) instead of re-running with a bigger LIMIT
+    def search():
+        return keyset_page(db.session.query(
+            User.id, User.full_name, User.username, User.email, User.user_type
+        ).filter(
+            User.is_active == True,
+            user_search_filter(query)
+        ), [User.full_name, User.id], after, per_page=10, descending=False)
     
-    return jsonify(results)
+    return Response(_cached_search(('users', query, after), search), mimetype='application/json')
@@ -5,9 +5,11 @@ Handles user registration, management, and profile operations
 
 from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
-from werkzeug.security import generate_password_hash
-from models.models import db, User, Transaction
+from models.models import db, hash_password, keyset_page, query_exists, user_search_filter, User, Transaction
+from routes.transactions import invalidate_search_cache, user_transaction_count
 from datetime import datetime
+from sqlalchemy import func, lambda_stmt, select
+from sqlalchemy.orm import joinedload
 
 users_bp = Blueprint('users', __name__)
 
@@ -19,7 +21,7 @@ def list_users():
         flash('Only administrators can view users list', 'danger')
         return redirect(url_for('dashboard'))
     
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     search = request.args.get('search', '')
     user_type = request.args.get('user_type', '')
     
@@ -27,22 +29,19 @@ def list_users():
     query = User.query.filter_by(is_active=True)
     
     if search:
-        query = query.filter(
-            User.username.contains(search) |
-            User.full_name.contains(search) |
-            User.email.contains(search)
-        )
+        query = query.filter(user_search_filter(search))
     
     if user_type:
         query = query.filter_by(user_type=user_type)
     
     # Pagination
-    users = query.order_by(User.full_name).paginate(
-        page=page, per_page=10, error_out=False
+    users, next_cursor = keyset_page(
+        query, [User.full_name, User.id], cursor, per_page=10, descending=False
     )
     
     return render_template('users/list.html', 
                          users=users, 
+                         next_cursor=next_cursor,
                          search=search, 
                          user_type=user_type)
 
@@ -69,13 +68,13 @@ def add_user():
             flash('Username, Email, Password, and Full Name are required', 'danger')
             return render_template('users/add.html')
         
-        # Check if username already exists
-        if User.query.filter_by(username=username).first():
+        # Check if username already exists (in any letter case)
+        if query_exists(User.query.filter(func.lower(User.username) == username.lower())):
             flash('Username already exists', 'danger')
             return render_template('users/add.html')
         
-        # Check if email already exists
-        if User.query.filter_by(email=email).first():
+        # Check if email already exists (in any letter case)
+        if query_exists(User.query.filter(func.lower(User.email) == email.lower())):
             flash('Email already exists', 'danger')
             return render_template('users/add.html')
         
@@ -83,7 +82,7 @@ def add_user():
         user = User(
             username=username,
             email=email,
-            password_hash=generate_password_hash(password),
+            password_hash=hash_password(password),
             full_name=full_name,
             phone=phone,
             address=address,
@@ -92,6 +91,7 @@ def add_user():
         
         db.session.add(user)
         db.session.commit()
+        invalidate_search_cache()
         
         flash(f'User "{full_name}" added successfully', 'success')
         return redirect(url_for('users.list_users'))
@@ -107,22 +107,25 @@ def view_user(user_id):
         flash('You can only view your own profile', 'danger')
         return redirect(url_for('dashboard'))
     
-    user = User.query.get_or_404(user_id)
+    user = db.get_or_404(User, user_id)
     
-    # Get transaction history for this user
-    transactions = Transaction.query.filter_by(user_id=user_id).order_by(
-        Transaction.created_at.desc()
-    ).limit(10).all()
+    # Get transaction history for this user (with each book's title).
+    # lambda_stmt caches the constructed statement, so only user_id is
+    # re-bound per request
+    transactions = db.session.scalars(lambda_stmt(
+        lambda: select(Transaction).options(joinedload(Transaction.book))
+        .where(Transaction.user_id == user_id)
+        .order_by(Transaction.created_at.desc()).limit(10)
+    )).all()
     
-    # Calculate statistics
-    total_transactions = Transaction.query.filter_by(user_id=user_id).count()
-    active_transactions = Transaction.query.filter_by(user_id=user_id, status='issued').count()
+    # Calculate statistics (open loans are counted as they are issued)
+    total_transactions = user_transaction_count(user_id)
     
     return render_template('users/view.html', 
                          user=user, 
                          transactions=transactions,
                          total_transactions=total_transactions,
-                         active_transactions=active_transactions)
+                         active_transactions=user.active_loans)
 
 @users_bp.route('/<int:user_id>/edit', methods=['GET', 'POST'])
 @login_required
@@ -133,7 +136,7 @@ def edit_user(user_id):
         flash('You can only edit your own profile', 'danger')
         return redirect(url_for('dashboard'))
     
-    user = User.query.get_or_404(user_id)
+    user = db.get_or_404(User, user_id)
     
     if request.method == 'POST':
         # Get form data
@@ -153,8 +156,7 @@ def edit_user(user_id):
             return render_template('users/edit.html', user=user)
         
         # Check if email already exists (excluding current user)
-        existing_user = User.query.filter(User.email == email, User.id != user_id).first()
-        if existing_user:
+        if query_exists(User.query.filter(func.lower(User.email) == email.lower(), User.id != user_id)):
             flash('Email already exists', 'danger')
             return render_template('users/edit.html', user=user)
         
@@ -165,6 +167,7 @@ def edit_user(user_id):
         user.address = address
         
         db.session.commit()
+        invalidate_search_cache()
         
         flash(f'User profile updated successfully', 'success')
         
@@ -183,7 +186,7 @@ def reset_password(user_id):
         flash('Only administrators can reset passwords', 'danger')
         return redirect(url_for('users.view_user', user_id=user_id))
     
-    user = User.query.get_or_404(user_id)
+    user = db.get_or_404(User, user_id)
     
     if request.method == 'POST':
         new_password = request.form.get('new_password')
@@ -200,7 +203,7 @@ def reset_password(user_id):
             return render_template('users/reset_password.html', user=user)
         
         # Update password
-        user.password_hash = generate_password_hash(new_password)
+        user.set_password(new_password)
         db.session.commit()
         
         flash(f'Password for "{user.full_name}" reset successfully', 'success')
@@ -216,7 +219,7 @@ def delete_user(user_id):
         flash('Only administrators can delete users', 'danger')
         return redirect(url_for('users.view_user', user_id=user_id))
     
-    user = User.query.get_or_404(user_id)
+    user = db.get_or_404(User, user_id)
     
     # Prevent deleting admin users or self
     if user.user_type == 'admin':
@@ -228,17 +231,19 @@ def delete_user(user_id):
         return redirect(url_for('users.view_user', user_id=user_id))
     
     # Check if user has active transactions
-    active_transactions = Transaction.query.filter_by(
+    # (EXISTS stops at the first match instead of counting them all)
+    has_active_transactions = query_exists(Transaction.query.filter_by(
         user_id=user_id, status='issued'
-    ).count()
+    ))
     
-    if active_transactions > 0:
+    if has_active_transactions:
         flash('Cannot delete user with active transactions', 'danger')
         return redirect(url_for('users.view_user', user_id=user_id))
     
     # Soft delete (mark as inactive)
     user.is_active = False
     db.session.commit()
+    invalidate_search_cache()
     
     flash(f'User "{user.full_name}" deleted successfully', 'success')
     return redirect(url_for('users.list_users'))
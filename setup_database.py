@@ -5,7 +5,6 @@ This script will be executed once during deployment
 
 import os
 import sqlite3
-from werkzeug.security import generate_password_hash
 
 def create_database():
     """Create database and tables"""
@@ -15,10 +14,21 @@ def create_database():
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
     
+    # WAL lets readers run alongside the writer and, with synchronous=NORMAL,
+    # avoids an fsync on every commit; journal_mode=WAL persists in the file
+    cursor.executescript("""
+        PRAGMA journal_mode=WAL;
+        PRAGMA synchronous=NORMAL;
+        PRAGMA cache_size=-20000;
+        PRAGMA mmap_size=268435456;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA foreign_keys=ON;
+    """)
+    
     # Create users table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            id INTEGER PRIMARY KEY,
             username VARCHAR(100) UNIQUE NOT NULL,
             email VARCHAR(100) UNIQUE NOT NULL,
             password_hash VARCHAR(255) NOT NULL,
@@ -34,7 +44,7 @@ def create_database():
     # Create books table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS books (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            id INTEGER PRIMARY KEY,
             title VARCHAR(200) NOT NULL,
             author VARCHAR(100) NOT NULL,
             isbn VARCHAR(20) UNIQUE,
@@ -53,7 +63,7 @@ def create_database():
     # Create transactions table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS transactions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            id INTEGER PRIMARY KEY,
             user_id INTEGER NOT NULL,
             book_id INTEGER NOT NULL,
             issue_date DATETIME DEFAULT CURRENT_TIMESTAMP,
@@ -70,7 +80,7 @@ def create_database():
     # Create fines table
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS fines (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            id INTEGER PRIMARY KEY,
             transaction_id INTEGER NOT NULL,
             amount REAL DEFAULT 0.0,
             per_day_rate REAL DEFAULT 1.0,
@@ -84,37 +94,50 @@ def create_database():
         )
     ''')
     
+    # Create indexes for the common filters and orderings
+    cursor.execute('CREATE INDEX IF NOT EXISTS ix_tx_status_due ON transactions (status, due_date)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS ix_tx_user_book_status ON transactions (user_id, book_id, status)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS ix_tx_user_created ON transactions (user_id, created_at DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS ix_users_active_name ON users (is_active, full_name)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS ix_books_active_avail_title ON books (is_active, available_copies, title)')
+    
     conn.commit()
     
-    # Add admin user
+    # Seed the admin user and sample books in one transaction. INSERT OR
+    # IGNORE skips rows whose username/ISBN already exist.
     admin_username = os.environ.get('ADMIN_USERNAME', 'admin')
     admin_password = os.environ.get('ADMIN_PASSWORD', 'admin123')
     admin_email = os.environ.get('ADMIN_EMAIL', 'admin@library.com')
     
-    cursor.execute("SELECT * FROM users WHERE username = ?", (admin_username,))
+    # Add admin user. Hashing is deliberately slow, so check for the admin
+    # first and only hash on the first deploy.
+    cursor.execute("SELECT 1 FROM users WHERE username = ? LIMIT 1", (admin_username,))
     if not cursor.fetchone():
+        # Imported here so redeploys with an existing admin never load werkzeug
+        from werkzeug.security import generate_password_hash
         admin_password_hash = generate_password_hash(admin_password)
         cursor.execute('''
-            INSERT INTO users (username, email, password_hash, full_name, user_type)
+            INSERT OR IGNORE INTO users (username, email, password_hash, full_name, user_type)
             VALUES (?, ?, ?, ?, ?)
         ''', (admin_username, admin_email, admin_password_hash, 'Library Administrator', 'admin'))
-        print(f"Admin user created: username={admin_username}")
+        if cursor.rowcount:
+            print(f"Admin user created: username={admin_username}")
     
     # Add sample books
-    cursor.execute("SELECT COUNT(*) FROM books")
-    if cursor.fetchone()[0] == 0:
-        sample_books = [
-            ('Python Programming', 'John Smith', '978-0-123456-78-9', 'Tech Books', 2020, 'Programming', 'Complete guide to Python programming', 3, 3, 'A1-101'),
-            ('Data Structures and Algorithms', 'Jane Doe', '978-0-234567-89-0', 'Computer Science Press', 2019, 'Computer Science', 'Fundamental concepts of data structures', 2, 2, 'B2-205'),
-            ('Web Development with Flask', 'Mike Johnson', '978-0-345678-90-1', 'Web Dev Books', 2021, 'Web Development', 'Learn Flask web framework', 1, 1, 'C3-301'),
-        ]
-        
-        cursor.executemany('''
-            INSERT INTO books (title, author, isbn, publisher, publication_year, category, description, total_copies, available_copies, location)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', sample_books)
+    sample_books = [
+        ('Python Programming', 'John Smith', '978-0-123456-78-9', 'Tech Books', 2020, 'Programming', 'Complete guide to Python programming', 3, 3, 'A1-101'),
+        ('Data Structures and Algorithms', 'Jane Doe', '978-0-234567-89-0', 'Computer Science Press', 2019, 'Computer Science', 'Fundamental concepts of data structures', 2, 2, 'B2-205'),
+        ('Web Development with Flask', 'Mike Johnson', '978-0-345678-90-1', 'Web Dev Books', 2021, 'Web Development', 'Learn Flask web framework', 1, 1, 'C3-301'),
+    ]
+    
+    cursor.executemany('''
+        INSERT OR IGNORE INTO books (title, author, isbn, publisher, publication_year, category, description, total_copies, available_copies, location)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', sample_books)
+    if cursor.rowcount:
         print("Sample books added")
     
+    conn.commit()
     conn.close()
     print(f"Database created successfully at: {db_path}")
 
@@ -3,60 +3,294 @@ Simple Flask Application for Library Management System
 This is a simplified version that works with our SQLite database
 """
 
+import atexit
+import json
 import sqlite3
 import os
+import queue
+import secrets
+import threading
+import time
 from datetime import datetime, timedelta
-from flask import Flask, render_template, request, redirect, url_for, session, flash, g
-from werkzeug.security import check_password_hash
+from flask import Flask, render_template, request, redirect, url_for, session, flash, make_response, g
+from werkzeug.security import check_password_hash, generate_password_hash
 from functools import wraps
+from models.fts import FTS_COLUMNS, fts_ddl
+
+try:
+    from argon2 import PasswordHasher
+    from argon2.exceptions import InvalidHashError, VerificationError
+except ImportError:  # argon2-cffi not installed; argon2 hashes cannot be checked
+    PasswordHasher = None
 
 app = Flask(__name__)
 # Use environment variable for secret key in production
 app.secret_key = os.environ.get('SECRET_KEY', 'library-management-secret-key')
+# Werkzeug hash method for new passwords, e.g. 'pbkdf2:sha256:260000'.
+# Unset means the default below, or a cheap method when testing.
+app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD')
 
 # Database configuration
 DATABASE = os.environ.get('DATABASE_PATH', os.path.join(os.path.dirname(__file__), 'library.db'))
 
-_schema_checked = False
+# Indexes for the filters, joins and orderings the routes use
+# (name, table and column list)
+INDEXES = (
+    ('ix_tx_status_due', 'transactions', 'status, due_date'),
+    ('ix_tx_status_user', 'transactions', 'status, user_id'),
+    ('ix_tx_book_status', 'transactions', 'book_id, status'),
+    ('ix_tx_user_created', 'transactions', 'user_id, created_at DESC'),
+    ('ix_tx_created', 'transactions', 'created_at DESC'),
+    ('ix_fines_status', 'fines', 'status'),
+    ('ix_fines_transaction', 'fines', 'transaction_id'),
+    ('ix_books_active_title', 'books', 'is_active, title'),
+    ('ix_users_active_name', 'users', 'is_active, full_name'),
+    ('ix_users_student_id', 'users', 'student_id'),
+)
+
+# Tables whose FTS index (models/fts.py, shared with the ORM app) exists,
+# filled in by ensure_schema
+_fts_tables = set()
+
+def create_fts_index(conn, table):
+    """Create, fill and attach the triggers of the FTS index for table"""
+    conn.executescript('BEGIN;\n' + ';\n'.join(fts_ddl(table)) + ';\nCOMMIT;')
+
+# Fines joined with their transaction, student and book, kept as a table
+# so the fines pages read one row per fine instead of joining four tables.
+# Triggers on all four tables keep it in step with the source rows.
+FINE_DETAILS_SELECT = '''
+    SELECT f.id, f.transaction_id, t.user_id, t.book_id,
+           f.amount, f.per_day_rate, f.days_late, f.total_amount, f.paid_amount,
+           f.status, f.created_at, f.paid_date,
+           u.full_name, u.username, u.email, u.phone,
+           b.title, b.author, b.isbn,
+           t.created_at, t.due_date, t.return_date
+    FROM fines f
+    JOIN transactions t ON f.transaction_id = t.id
+    JOIN users u ON t.user_id = u.id
+    JOIN books b ON t.book_id = b.id
+'''
+
+def create_fine_details(conn):
+    """Create, fill and attach the sync triggers of the fine_details table"""
+    conn.executescript(f'''
+        BEGIN;
+        CREATE TABLE fine_details (
+            id INTEGER PRIMARY KEY,
+            transaction_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            book_id INTEGER NOT NULL,
+            amount REAL,
+            per_day_rate REAL,
+            days_late INTEGER,
+            total_amount REAL,
+            paid_amount REAL,
+            status VARCHAR(20),
+            created_at DATETIME,
+            paid_date DATETIME,
+            full_name VARCHAR(100),
+            username VARCHAR(100),
+            email VARCHAR(100),
+            phone VARCHAR(20),
+            title VARCHAR(200),
+            author VARCHAR(100),
+            isbn VARCHAR(20),
+            issue_date DATETIME,
+            due_date DATETIME,
+            return_date DATETIME
+        );
+        CREATE INDEX ix_fine_details_created ON fine_details (created_at DESC);
+        CREATE INDEX ix_fine_details_transaction ON fine_details (transaction_id);
+        CREATE INDEX ix_fine_details_user ON fine_details (user_id);
+        CREATE INDEX ix_fine_details_book ON fine_details (book_id);
+        CREATE TRIGGER fine_details_fines_ai AFTER INSERT ON fines BEGIN
+            INSERT OR REPLACE INTO fine_details {FINE_DETAILS_SELECT} WHERE f.id = new.id;
+        END;
+        CREATE TRIGGER fine_details_fines_au AFTER UPDATE ON fines BEGIN
+            DELETE FROM fine_details WHERE id = old.id;
+            INSERT OR REPLACE INTO fine_details {FINE_DETAILS_SELECT} WHERE f.id = new.id;
+        END;
+        CREATE TRIGGER fine_details_fines_ad AFTER DELETE ON fines BEGIN
+            DELETE FROM fine_details WHERE id = old.id;
+        END;
+        CREATE TRIGGER fine_details_transactions_au
+        AFTER UPDATE OF user_id, book_id, created_at, due_date, return_date ON transactions BEGIN
+            INSERT OR REPLACE INTO fine_details {FINE_DETAILS_SELECT} WHERE f.transaction_id = new.id;
+        END;
+        CREATE TRIGGER fine_details_users_au
+        AFTER UPDATE OF full_name, username, email, phone ON users BEGIN
+            UPDATE fine_details SET full_name = new.full_name, username = new.username,
+                                    email = new.email, phone = new.phone
+            WHERE user_id = new.id;
+        END;
+        CREATE TRIGGER fine_details_books_au AFTER UPDATE OF title, author, isbn ON books BEGIN
+            UPDATE fine_details SET title = new.title, author = new.author, isbn = new.isbn
+            WHERE book_id = new.id;
+        END;
+        INSERT INTO fine_details {FINE_DETAILS_SELECT};
+        COMMIT;
+    ''')
 
+def search_clause(table, alias, search):
+    """SQL condition and parameters matching rows of table that contain search"""
+    # Trigrams cannot match terms shorter than 3 characters
+    if table in _fts_tables and len(search) >= 3:
+        phrase = '"' + search.replace('"', '""') + '"'
+        return f'{alias}.id IN (SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH ?)', [phrase]
+    
+    conditions = ' OR '.join(f'{alias}.{c} LIKE ?' for c in FTS_COLUMNS[table])
+    return f'({conditions})', [f'%{search}%'] * len(FTS_COLUMNS[table])
+
+
+def has_column(conn, table, column):
+    """Check whether table has column, stopping at the matching row"""
+    return conn.execute(
+        'SELECT 1 FROM pragma_table_info(?) WHERE name = ?', (table, column)
+    ).fetchone() is not None
 
 def ensure_schema(conn):
-    global _schema_checked
-    if _schema_checked:
-        return
+    """Bring an existing database up to date; False if it has no tables yet"""
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'books'").fetchone():
+        return False
 
-    # Check books table
-    columns = [row['name'] for row in conn.execute('PRAGMA table_info(books)').fetchall()]
-    if not columns:
-        return
-    if 'price' not in columns:
-        conn.execute('ALTER TABLE books ADD COLUMN price REAL DEFAULT 0.0')
-        conn.commit()
+    # Add columns introduced after the database was created
+    with conn:
+        if not has_column(conn, 'books', 'price'):
+            conn.execute('ALTER TABLE books ADD COLUMN price REAL DEFAULT 0.0')
+        if not has_column(conn, 'users', 'student_id'):
+            conn.execute('ALTER TABLE users ADD COLUMN student_id VARCHAR(20)')
 
-    # Check users table
-    user_columns = [row['name'] for row in conn.execute('PRAGMA table_info(users)').fetchall()]
-    if 'student_id' not in user_columns:
-        conn.execute('ALTER TABLE users ADD COLUMN student_id VARCHAR(20)')
+    # Create missing indexes, then refresh the planner statistics so
+    # SQLite starts using them
+    existing = {row['name'] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    missing = [index for index in INDEXES if index[0] not in existing]
+    for name, table, columns in missing:
+        conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})')
+    if missing:
+        conn.execute('ANALYZE')
         conn.commit()
 
-    _schema_checked = True
+    # Create the search indexes; without FTS5 or the trigram tokenizer
+    # (SQLite 3.34+) searches keep using LIKE
+    for table in FTS_COLUMNS:
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = ?", (f'{table}_fts',)).fetchone():
+            _fts_tables.add(table)
+            continue
+        try:
+            create_fts_index(conn, table)
+            _fts_tables.add(table)
+        except sqlite3.OperationalError:
+            conn.rollback()
+
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'fine_details'").fetchone():
+        create_fine_details(conn)
+
+    return True
+
+def db_datetime(value):
+    """Format a datetime the way it is stored: ISO 8601, to the second"""
+    return value.isoformat(sep=' ', timespec='seconds')
+
+def hash_password(password):
+    """Hash a new password with the configured method"""
+    method = app.config.get('PASSWORD_HASH_METHOD')
+    if not method:
+        # pbkdf2 cost grows linearly with the iterations; tests don't need
+        # hashes that are expensive to crack
+        method = 'pbkdf2:sha1:1000' if app.testing else 'pbkdf2:sha256:260000'
+    return generate_password_hash(password, method=method)
+
+def check_password(password_hash, password):
+    """Check a password against a werkzeug hash or an argon2 one
+    
+    Users created or changed through the ORM app (models.hash_password)
+    have argon2 hashes, which werkzeug cannot read.
+    """
+    if password_hash.startswith('$argon2'):
+        if PasswordHasher is None:
+            return False
+        try:
+            return PasswordHasher().verify(password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    try:
+        return check_password_hash(password_hash, password)
+    except ValueError:  # a hash format werkzeug does not know
+        return False
+
+# Applied to every new connection. WAL lets readers run alongside a writer
+# and, with synchronous=NORMAL, skips an fsync per commit; the larger page
+# cache and memory-mapped reads keep dashboard aggregates off the disk.
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-65536',
+    'PRAGMA mmap_size=268435456',
+)
+
+# Open connections kept for reuse across requests, so most requests skip
+# the connect and the pragma setup. Each request borrows one and hands it
+# back on teardown; connections beyond POOL_SIZE are closed.
+POOL_SIZE = 8
+_pool = queue.LifoQueue(maxsize=POOL_SIZE)
+
+# Set once ensure_schema has found (and upgraded) the tables; the lock
+# keeps concurrent first requests from upgrading the schema twice
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+def connect_db():
+    """Open and configure a new database connection"""
+    # A larger statement cache keeps every route's prepared SQL around
+    # for the connection's lifetime
+    db = sqlite3.connect(DATABASE, check_same_thread=False, cached_statements=256)
+    db.row_factory = sqlite3.Row
+    for pragma in SQLITE_PRAGMAS:
+        db.execute(pragma)
+    return db
 
 def get_db():
     """Get database connection"""
-    db = getattr(g, '_database', None)
+    global _schema_ready
+    db = g.get('db')
     if db is None:
-        db = g._database = sqlite3.connect(DATABASE)
-        db.row_factory = sqlite3.Row
-        ensure_schema(db)
+        try:
+            db = _pool.get_nowait()
+        except queue.Empty:
+            db = connect_db()
+        g.db = db
+    
+    # Checked once per process (and retried until the tables exist)
+    if not _schema_ready:
+        with _schema_lock:
+            if not _schema_ready:
+                _schema_ready = ensure_schema(db)
     return db
 
 @app.teardown_appcontext
 def close_connection(exception):
-    """Close database connection"""
-    db = getattr(g, '_database', None)
-    if db is not None:
+    """End any transaction a failed request left open and return the connection"""
+    db = g.pop('db', None)
+    if db is None:
+        return
+    if db.in_transaction:
+        db.rollback()
+    try:
+        _pool.put_nowait(db)
+    except queue.Full:
         db.close()
 
+@atexit.register
+def close_all_connections():
+    """Close the pooled connections on shutdown"""
+    while True:
+        try:
+            _pool.get_nowait().close()
+        except queue.Empty:
+            break
+
 def login_required(f):
     """Login required decorator"""
     @wraps(f)
@@ -77,6 +311,141 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+# Dashboard queries, kept as module constants so every request executes
+# the identical SQL text and hits the connection's statement cache.
+# All four counters in a single statement:
+DASHBOARD_STATS_SQL = '''
+    SELECT (SELECT COUNT(*) FROM books WHERE is_active = 1),
+           (SELECT COUNT(*) FROM users WHERE is_active = 1),
+           (SELECT COUNT(*) FROM transactions WHERE status = 'issued'),
+           (SELECT COUNT(*) FROM transactions WHERE status = 'issued' AND due_date < ?)
+'''
+
+# The four dashboard lists in a single statement: each is a subquery
+# aggregated into a JSON array (in the subquery's order) and decoded back
+# into a list of dicts by the dashboard view.
+DASHBOARD_LISTS_SQL = '''
+    SELECT
+        -- Students currently borrowing books (who are taking books home)
+        (SELECT json_group_array(json_object(
+                    'id', id, 'full_name', full_name, 'username', username,
+                    'email', email, 'phone', phone,
+                    'active_books_count', active_books_count))
+         FROM (SELECT u.id, u.full_name, u.username, u.email, u.phone,
+                      COUNT(t.id) as active_books_count
+               FROM users u
+               JOIN transactions t ON u.id = t.user_id
+               WHERE t.status = 'issued' AND u.is_active = 1
+               GROUP BY u.id, u.full_name, u.username, u.email, u.phone
+               ORDER BY u.full_name)) AS students_with_books,
+        -- Recent transactions with full details
+        (SELECT json_group_array(json_object(
+                    'id', id, 'user_id', user_id, 'book_id', book_id,
+                    'issue_date', issue_date, 'due_date', due_date,
+                    'return_date', return_date, 'status', status, 'notes', notes,
+                    'created_at', created_at, 'full_name', full_name,
+                    'username', username, 'email', email, 'phone', phone,
+                    'title', title, 'author', author, 'isbn', isbn))
+         FROM (SELECT t.*, u.full_name, u.username, u.email, u.phone, b.title, b.author, b.isbn
+               FROM transactions t
+               JOIN users u ON t.user_id = u.id
+               JOIN books b ON t.book_id = b.id
+               ORDER BY t.created_at DESC
+               LIMIT 10)) AS recent_transactions,
+        -- Unpaid fines
+        (SELECT json_group_array(json_object(
+                    'id', id, 'transaction_id', transaction_id, 'amount', amount,
+                    'per_day_rate', per_day_rate, 'days_late', days_late,
+                    'total_amount', total_amount, 'paid_amount', paid_amount,
+                    'status', status, 'created_at', created_at, 'paid_date', paid_date,
+                    'user_id', user_id, 'full_name', full_name,
+                    'username', username, 'title', title))
+         FROM (SELECT f.*, t.user_id, u.full_name, u.username, b.title
+               FROM fines f
+               JOIN transactions t ON f.transaction_id = t.id
+               JOIN users u ON t.user_id = u.id
+               JOIN books b ON t.book_id = b.id
+               WHERE f.status = 'unpaid'
+               ORDER BY f.created_at DESC)) AS unpaid_fines,
+        -- Low stock books
+        (SELECT json_group_array(json_object(
+                    'id', id, 'title', title, 'author', author, 'isbn', isbn,
+                    'publisher', publisher, 'publication_year', publication_year,
+                    'category', category, 'description', description,
+                    'total_copies', total_copies, 'available_copies', available_copies,
+                    'location', location, 'price', price, 'is_active', is_active))
+         FROM (SELECT * FROM books
+               WHERE is_active = 1 AND available_copies <= 1
+               LIMIT 5)) AS low_stock_books
+'''
+
+# Dashboard counters, cached briefly so repeated dashboard loads don't
+# re-count the tables; routes that change the data drop the cache.
+DASHBOARD_STATS_TTL = 30
+_dashboard_stats_cache = {'ts': 0, 'value': None}
+
+def get_dashboard_stats(db):
+    """Return (total_books, total_users, issued_books, overdue_books)"""
+    now = time.monotonic()
+    if not _dashboard_stats_cache['ts'] or now - _dashboard_stats_cache['ts'] > DASHBOARD_STATS_TTL:
+        # All four counts in a single statement
+        _dashboard_stats_cache['value'] = tuple(db.execute(
+            DASHBOARD_STATS_SQL, (db_datetime(datetime.now()),)
+        ).fetchone())
+        _dashboard_stats_cache['ts'] = now
+    return _dashboard_stats_cache['value']
+
+# Rendered read-only pages, keyed by (path with query string, user id).
+# Pages are re-rendered after PAGE_CACHE_TTL seconds or any write.
+# The cache is per process: with several gunicorn workers, a write only
+# clears the cache of the worker that handled it, so the other workers can
+# serve pre-write pages for up to PAGE_CACHE_TTL seconds.
+PAGE_CACHE_TTL = 15
+PAGE_CACHE_SIZE = 256
+_page_cache = {}
+_page_cache_lock = threading.Lock()
+
+def cached_page(f):
+    """Serve a GET page from the page cache, with an ETag for 304 replies"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        # Pages showing flashed messages must not be cached or replayed
+        if session.get('_flashes'):
+            return f(*args, **kwargs)
+        
+        key = (request.full_path, session.get('user_id'))
+        now = time.monotonic()
+        entry = _page_cache.get(key)
+        if entry and now - entry[0] <= PAGE_CACHE_TTL:
+            body = entry[1]
+        else:
+            body = f(*args, **kwargs)
+            if not isinstance(body, str):
+                return body
+            # Locked so concurrent requests and invalidate_caches() cannot
+            # empty the cache between the size check and the eviction
+            with _page_cache_lock:
+                if len(_page_cache) >= PAGE_CACHE_SIZE:
+                    # Drop the oldest entry (dicts keep insertion order)
+                    _page_cache.pop(next(iter(_page_cache)))
+                _page_cache.pop(key, None)
+                _page_cache[key] = (now, body)
+        
+        response = make_response(body)
+        response.add_etag()
+        return response.make_conditional(request)
+    return decorated_function
+
+def invalidate_caches():
+    """Force the next dashboard load to recount and pages to re-render"""
+    _dashboard_stats_cache['ts'] = 0
+    with _page_cache_lock:
+        _page_cache.clear()
+
+
+# Rows per page of the transactions list
+TRANSACTIONS_PER_PAGE = 50
+
 
 # Routes
 @app.route('/')
@@ -96,7 +465,7 @@ def login():
         db = get_db()
         user = db.execute('SELECT * FROM users WHERE username = ? AND is_active = 1', (username,)).fetchone()
         
-        if user and check_password_hash(user['password_hash'], password):
+        if user and check_password(user['password_hash'], password):
             # Only allow admin users to login
             if user['user_type'] != 'admin':
                 flash('Only administrators can access this system', 'danger')
@@ -122,54 +491,25 @@ def logout():
 
 @app.route('/dashboard')
 @login_required
+@cached_page
 def dashboard():
     """Dashboard - Student Management Overview"""
     db = get_db()
     
     # Get statistics
-    total_books = db.execute('SELECT COUNT(*) as count FROM books WHERE is_active = 1').fetchone()['count']
-    total_users = db.execute('SELECT COUNT(*) as count FROM users WHERE is_active = 1').fetchone()['count']
-    issued_books = db.execute('SELECT COUNT(*) as count FROM transactions WHERE status = "issued"').fetchone()['count']
-    overdue_books = db.execute('SELECT COUNT(*) as count FROM transactions WHERE status = "issued" AND due_date < ?', (datetime.now(),)).fetchone()['count']
-    
-    # Get students currently borrowing books (who are taking books home)
-    students_with_books = db.execute('''
-        SELECT DISTINCT u.id, u.full_name, u.username, u.email, u.phone,
-               COUNT(t.id) as active_books_count
-        FROM users u
-        JOIN transactions t ON u.id = t.user_id
-        WHERE t.status = 'issued' AND u.is_active = 1
-        GROUP BY u.id, u.full_name, u.username, u.email, u.phone
-        ORDER BY u.full_name
-    ''').fetchall()
-    
-    # Recent transactions with full details
-    recent_transactions = db.execute('''
-        SELECT t.*, u.full_name, u.username, u.email, u.phone, b.title, b.author, b.isbn
-        FROM transactions t
-        JOIN users u ON t.user_id = u.id
-        JOIN books b ON t.book_id = b.id
-        ORDER BY t.created_at DESC
-        LIMIT 10
-    ''').fetchall()
+    total_books, total_users, issued_books, overdue_books = get_dashboard_stats(db)
     
-    # Get unpaid fines
-    unpaid_fines = db.execute('''
-        SELECT f.*, u.full_name, u.username, b.title
-        FROM fines f
-        JOIN transactions t ON f.transaction_id = t.id
-        JOIN users u ON t.user_id = u.id
-        JOIN books b ON t.book_id = b.id
-        WHERE f.status = 'unpaid'
-        ORDER BY f.created_at DESC
-    ''').fetchall()
+    # The four dashboard lists, fetched in one statement. json_group_array
+    # does not promise to keep the subqueries' ORDER BY, so sort again here.
+    lists = db.execute(DASHBOARD_LISTS_SQL).fetchone()
     
-    # Low stock books
-    low_stock_books = db.execute('''
-        SELECT * FROM books 
-        WHERE is_active = 1 AND available_copies <= 1
-        LIMIT 5
-    ''').fetchall()
+    students_with_books = sorted(json.loads(lists['students_with_books']),
+                                 key=lambda student: student['full_name'])
+    recent_transactions = sorted(json.loads(lists['recent_transactions']),
+                                 key=lambda transaction: transaction['created_at'] or '', reverse=True)
+    unpaid_fines = sorted(json.loads(lists['unpaid_fines']),
+                          key=lambda fine: fine['created_at'] or '', reverse=True)
+    low_stock_books = json.loads(lists['low_stock_books'])
     
     return render_template('dashboard.html',
                          total_books=total_books,
@@ -183,6 +523,7 @@ def dashboard():
 
 @app.route('/books')
 @login_required
+@cached_page
 def books():
     """Books list"""
     db = get_db()
@@ -192,8 +533,8 @@ def books():
     params = []
     
     if search:
-        query += ' AND (title LIKE ? OR author LIKE ? OR isbn LIKE ?)'
-        params = [f'%{search}%', f'%{search}%', f'%{search}%']
+        condition, params = search_clause('books', 'books', search)
+        query += f' AND {condition}'
     
     query += ' ORDER BY title'
     
@@ -218,19 +559,22 @@ def add_book():
         
         db = get_db()
         
-        # Check if ISBN exists
-        existing = db.execute('SELECT id FROM books WHERE isbn = ?', (isbn,)).fetchone()
-        if existing:
-            flash('A book with this ISBN already exists', 'danger')
-            return render_template('books/add_simple.html')
-        
-        # Insert book
-        db.execute('''
+        # Insert book unless its ISBN is taken, in one statement; no
+        # inserted row means the ISBN already exists (ON CONFLICT DO NOTHING
+        # needs SQLite 3.24, unlike RETURNING's 3.35)
+        inserted = db.execute('''
             INSERT INTO books (title, author, isbn, publisher, publication_year, category, description, total_copies, available_copies, location, price)
             VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (title, author, isbn, publisher, publication_year, category, description, total_copies, total_copies, location, price))
+            ON CONFLICT(isbn) DO NOTHING
+        ''', (title, author, isbn, publisher, publication_year, category, description, total_copies, total_copies, location, price)).rowcount
         db.commit()
         
+        if not inserted:
+            flash('A book with this ISBN already exists', 'danger')
+            return render_template('books/add_simple.html')
+        
+        invalidate_caches()
+        
         flash(f'Book "{title}" added successfully', 'success')
         return redirect(url_for('books'))
     
@@ -292,6 +636,7 @@ def edit_book(book_id):
                       (total_copies - issued_copies, book_id))
         
         db.commit()
+        invalidate_caches()
         
         flash(f'Book "{title}" updated successfully', 'success')
         return redirect(url_for('books'))
@@ -323,6 +668,7 @@ def delete_book(book_id):
     # Soft delete (mark as inactive)
     db.execute('UPDATE books SET is_active = 0 WHERE id = ?', (book_id,))
     db.commit()
+    invalidate_caches()
     
     flash(f'Book "{book["title"]}" deleted successfully', 'success')
     return redirect(url_for('books'))
@@ -332,18 +678,27 @@ def delete_book(book_id):
 def transactions():
     """Transactions list"""
     db = get_db()
+    page = max(request.args.get('page', 1, type=int), 1)
     
+    # One page at a time, newest first; the created_at index lets SQLite
+    # stop after the page instead of sorting every transaction. One extra
+    # row is fetched to tell whether there is a next page.
     query = '''
         SELECT t.*, u.full_name, b.title 
         FROM transactions t
         JOIN users u ON t.user_id = u.id
         JOIN books b ON t.book_id = b.id
         ORDER BY t.created_at DESC
+        LIMIT ? OFFSET ?
     '''
     
-    transactions = db.execute(query).fetchall()
+    transactions = db.execute(query, (TRANSACTIONS_PER_PAGE + 1, (page - 1) * TRANSACTIONS_PER_PAGE)).fetchall()
+    has_next = len(transactions) > TRANSACTIONS_PER_PAGE
     
-    return render_template('transactions/list_simple.html', transactions=transactions)
+    return render_template('transactions/list_simple.html',
+                         transactions=transactions[:TRANSACTIONS_PER_PAGE],
+                         page=page,
+                         has_next=has_next)
 
 @app.route('/transactions/issue', methods=['GET', 'POST'])
 @admin_required
@@ -378,11 +733,12 @@ def issue_book():
         db.execute('''
             INSERT INTO transactions (user_id, book_id, due_date, notes, status)
             VALUES (?, ?, ?, ?, 'issued')
-        ''', (user_id, book_id, due_date, notes))
+        ''', (user_id, book_id, db_datetime(due_date), notes))
         
         # Update book availability
         db.execute('UPDATE books SET available_copies = available_copies - 1 WHERE id = ?', (book_id,))
         db.commit()
+        invalidate_caches()
         
         flash(f'Book "{book["title"]}" issued successfully', 'success')
         return redirect(url_for('transactions'))
@@ -415,11 +771,9 @@ def return_book(transaction_id):
     status = 'returned'
     fine_amount = 0
     
-    # Check if overdue
-    try:
-        due_date = datetime.strptime(transaction['due_date'], '%Y-%m-%d %H:%M:%S.%f')
-    except ValueError:
-        due_date = datetime.strptime(transaction['due_date'], '%Y-%m-%d %H:%M:%S')
+    # Check if overdue (fromisoformat reads dates stored with or without
+    # fractional seconds)
+    due_date = datetime.fromisoformat(transaction['due_date'])
     
     if return_date > due_date:
         days_late = (return_date - due_date).days
@@ -435,11 +789,12 @@ def return_book(transaction_id):
     else:
         flash('Book returned successfully', 'success')
     
-    db.execute('UPDATE transactions SET return_date = ?, status = ? WHERE id = ?', (return_date, status, transaction_id))
+    db.execute('UPDATE transactions SET return_date = ?, status = ? WHERE id = ?', (db_datetime(return_date), status, transaction_id))
     
     # Update book availability
     db.execute('UPDATE books SET available_copies = available_copies + 1 WHERE id = ?', (transaction['book_id'],))
     db.commit()
+    invalidate_caches()
     
     return redirect(url_for('transactions'))
 
@@ -450,22 +805,34 @@ def students():
     db = get_db()
     search = request.args.get('search', '')
     
+    # Loans and fines are totalled per user before joining, so a student
+    # with many of both doesn't multiply into loans x fines rows
     query = '''
         SELECT u.*, 
-               COUNT(CASE WHEN t.status = 'issued' THEN 1 END) as active_books_count,
-               COALESCE(SUM(CASE WHEN f.status = 'unpaid' THEN f.total_amount ELSE 0 END), 0) as total_fines
+               COALESCE(tc.active_books_count, 0) as active_books_count,
+               COALESCE(fs.total_fines, 0) as total_fines
         FROM users u
-        LEFT JOIN transactions t ON u.id = t.user_id
-        LEFT JOIN fines f ON t.id = f.transaction_id
+        LEFT JOIN (
+            SELECT user_id, COUNT(*) as active_books_count
+            FROM transactions
+            WHERE status = 'issued'
+            GROUP BY user_id
+        ) tc ON tc.user_id = u.id
+        LEFT JOIN (
+            SELECT t.user_id, SUM(f.total_amount) as total_fines
+            FROM fines f
+            JOIN transactions t ON f.transaction_id = t.id
+            WHERE f.status = 'unpaid'
+            GROUP BY t.user_id
+        ) fs ON fs.user_id = u.id
         WHERE u.is_active = 1 AND u.user_type = 'student'
     '''
     params = []
     
     if search:
-        query += ' AND (u.full_name LIKE ? OR u.username LIKE ? OR u.email LIKE ?)'
-        params = [f'%{search}%', f'%{search}%', f'%{search}%']
+        condition, params = search_clause('users', 'u', search)
+        query += f' AND {condition}'
     
-    query += ' GROUP BY u.id, u.student_id, u.full_name, u.username, u.email, u.phone, u.address, u.password_hash, u.user_type, u.is_active'
     query += ' ORDER BY u.full_name'
     
     students = db.execute(query, params).fetchall()
@@ -504,11 +871,18 @@ def add_student():
         
         # Generate username from full name
         base_username = full_name.lower().replace(' ', '.').replace('-', '.')
+        
+        # Ensure username is unique: fetch the base name and its numbered
+        # variants in one query, then take the first free one. GLOB is
+        # case-sensitive, so SQLite can serve it from the username index
+        glob_base = ''.join(f'[{ch}]' if ch in '*?[' else ch for ch in base_username)
+        taken = {row['username'] for row in db.execute(
+            'SELECT username FROM users WHERE username = ? OR username GLOB ?',
+            (base_username, glob_base + '[0-9]*')
+        )}
         username = base_username
         counter = 1
-        
-        # Ensure username is unique
-        while db.execute('SELECT id FROM users WHERE username = ?', (username,)).fetchone():
+        while username in taken:
             username = f"{base_username}{counter}"
             counter += 1
         
@@ -517,57 +891,51 @@ def add_student():
             flash('Email already exists', 'danger')
             return render_template('students/add.html')
         
-        # Generate random password
-        import random
-        import string
-        password = ''.join(random.choices(string.ascii_letters + string.digits, k=8))
-        
-        # Create new student
-        from werkzeug.security import generate_password_hash
-        db.execute('''
-            INSERT INTO users (student_id, username, email, password_hash, full_name, phone, address, user_type)
-            VALUES (?, ?, ?, ?, ?, ?, ?, 'student')
-        ''', (student_id if student_id else None, username, email, generate_password_hash(password), full_name, phone, address))
-        db.commit()
+        # Generate random password (6 random bytes, 8 URL-safe characters),
+        # hashed before the transaction starts so the write lock is not held
+        # while it runs
+        password = secrets.token_urlsafe(6)
+        password_hash = hash_password(password)
         
-        # Get the student database ID
-        student_db_id = db.execute('SELECT last_insert_rowid()').fetchone()[0]
-        
-        # If book details are provided, add the book
-        if book_title and book_author:
-            # Check if book already exists
-            existing_book = db.execute(
-                'SELECT id FROM books WHERE title = ? AND author = ?',
-                (book_title, book_author),
-            ).fetchone()
-
-            if existing_book:
-                book_id = existing_book['id']
-                if book_price is not None:
-                    db.execute('UPDATE books SET price = ? WHERE id = ?', (book_price, book_id))
-                    db.commit()
-            else:
-                # Add the book
-                db.execute('''
-                    INSERT INTO books (title, author, isbn, category, description, total_copies, available_copies, price)
-                    VALUES (?, ?, ?, ?, ?, 1, 1, ?)
-                ''', (book_title, book_author, book_isbn, book_category, book_description, book_price if book_price is not None else 0))
-                db.commit()
+        # Create the student and, when book details are given, add the book
+        # and issue it, in one transaction (sqlite3 commits once on exit)
+        with db:
+            # Create new student
+            student_db_id = db.execute('''
+                INSERT INTO users (student_id, username, email, password_hash, full_name, phone, address, user_type)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'student')
+            ''', (student_id if student_id else None, username, email, password_hash, full_name, phone, address)).lastrowid
+            
+            # If book details are provided, add the book
+            if book_title and book_author:
+                # Check if book already exists
+                existing_book = db.execute(
+                    'SELECT id FROM books WHERE title = ? AND author = ?',
+                    (book_title, book_author),
+                ).fetchone()
 
-                # Get the book ID
-                book_id = db.execute('SELECT last_insert_rowid()').fetchone()[0]
+                if existing_book:
+                    book_id = existing_book['id']
+                    if book_price is not None:
+                        db.execute('UPDATE books SET price = ? WHERE id = ?', (book_price, book_id))
+                else:
+                    # Add the book
+                    book_id = db.execute('''
+                        INSERT INTO books (title, author, isbn, category, description, total_copies, available_copies, price)
+                        VALUES (?, ?, ?, ?, ?, 1, 1, ?)
+                    ''', (book_title, book_author, book_isbn, book_category, book_description, book_price if book_price is not None else 0)).lastrowid
 
-            # Issue the book to the student
-            due_date = datetime.now() + timedelta(days=14)
+                # Issue the book to the student
+                due_date = datetime.now() + timedelta(days=14)
 
-            db.execute('''
-                INSERT INTO transactions (user_id, book_id, due_date, status)
-                VALUES (?, ?, ?, 'issued')
-            ''', (student_db_id, book_id, due_date))
+                db.execute('''
+                    INSERT INTO transactions (user_id, book_id, due_date, status)
+                    VALUES (?, ?, ?, 'issued')
+                ''', (student_db_id, book_id, db_datetime(due_date)))
 
-            # Update book availability
-            db.execute('UPDATE books SET available_copies = available_copies - 1 WHERE id = ?', (book_id,))
-            db.commit()
+                # Update book availability
+                db.execute('UPDATE books SET available_copies = available_copies - 1 WHERE id = ?', (book_id,))
+        invalidate_caches()
         
         flash(f'Student "{full_name}" added successfully! Username: {username}, Password: {password}', 'success')
         return redirect(url_for('students'))
@@ -585,10 +953,15 @@ def view_student(student_id):
         flash('Student not found', 'danger')
         return redirect(url_for('students'))
     
-    # Get transaction history for this student
+    # Get transaction history for this student. The window aggregates run
+    # over all of the student's transactions (before the LIMIT), so their
+    # totals come back on every row of the same query
     transactions = db.execute('''
         SELECT t.*, b.title, b.author,
-               f.total_amount as fine_amount, f.status as fine_status
+               f.total_amount as fine_amount, f.status as fine_status,
+               SUM(CASE WHEN f.status = 'unpaid' THEN f.total_amount ELSE 0 END) OVER () as total_unpaid_fines,
+               COUNT(*) OVER () as total_count,
+               SUM(CASE WHEN t.status = 'issued' THEN 1 ELSE 0 END) OVER () as active_count
         FROM transactions t
         JOIN books b ON t.book_id = b.id
         LEFT JOIN fines f ON t.id = f.transaction_id
@@ -597,17 +970,13 @@ def view_student(student_id):
         LIMIT 10
     ''', (student_id,)).fetchall()
     
-    # Get student's total fines
-    total_fines = db.execute('''
-        SELECT COALESCE(SUM(total_amount), 0) as total
-        FROM fines f
-        JOIN transactions t ON f.transaction_id = t.id
-        WHERE t.user_id = ? AND f.status = 'unpaid'
-    ''', (student_id,)).fetchone()['total']
-    
-    # Calculate statistics
-    total_transactions = len(transactions)
-    active_transactions = len([t for t in transactions if t['status'] == 'issued'])
+    # Get student's total fines and statistics
+    if transactions:
+        total_fines = transactions[0]['total_unpaid_fines'] or 0
+        total_transactions = transactions[0]['total_count']
+        active_transactions = transactions[0]['active_count']
+    else:
+        total_fines = total_transactions = active_transactions = 0
     
     # Convert student to dict to add total_fines
     student_dict = dict(student)
@@ -671,6 +1040,7 @@ def edit_student(student_id):
             WHERE id = ?
         ''', (email, full_name, phone, address, user_type, student_id_field if student_id_field else None, student_id))
         db.commit()
+        invalidate_caches()
         
         flash(f'Student "{full_name}" updated successfully', 'success')
         return redirect(url_for('students'))
@@ -712,12 +1082,14 @@ def delete_student(student_id):
     # Soft delete (mark as inactive)
     db.execute('UPDATE users SET is_active = 0 WHERE id = ?', (student_id,))
     db.commit()
+    invalidate_caches()
     
     flash(f'Student "{student["full_name"]}" deleted successfully', 'success')
     return redirect(url_for('students'))
 
 @app.route('/reports')
 @login_required
+@cached_page
 def reports():
     """Reports dashboard"""
     return render_template('reports/dashboard_simple.html')
@@ -728,17 +1100,8 @@ def fines():
     """Fines management"""
     db = get_db()
     
-    # Get all fines with details
-    fines = db.execute('''
-        SELECT f.*, u.full_name, u.username, u.email, u.phone,
-               b.title, b.author, b.isbn,
-               t.created_at as issue_date, t.due_date, t.return_date
-        FROM fines f
-        JOIN transactions t ON f.transaction_id = t.id
-        JOIN users u ON t.user_id = u.id
-        JOIN books b ON t.book_id = b.id
-        ORDER BY f.created_at DESC
-    ''').fetchall()
+    # Get all fines with details (kept joined in fine_details)
+    fines = db.execute('SELECT * FROM fine_details ORDER BY created_at DESC').fetchall()
     
     return render_template('fines/list.html', fines=fines)
 
@@ -749,14 +1112,7 @@ def pay_fine(fine_id):
     db = get_db()
     
     # Get fine
-    fine = db.execute('''
-        SELECT f.*, u.full_name, b.title
-        FROM fines f
-        JOIN transactions t ON f.transaction_id = t.id
-        JOIN users u ON t.user_id = u.id
-        JOIN books b ON t.book_id = b.id
-        WHERE f.id = ?
-    ''', (fine_id,)).fetchone()
+    fine = db.execute('SELECT * FROM fine_details WHERE id = ?', (fine_id,)).fetchone()
     
     if not fine:
         flash('Fine not found', 'danger')
@@ -768,8 +1124,9 @@ def pay_fine(fine_id):
     
     # Mark fine as paid
     db.execute('UPDATE fines SET status = "paid", paid_date = ? WHERE id = ?', 
-              (datetime.now(), fine_id))
+              (db_datetime(datetime.now()), fine_id))
     db.commit()
+    invalidate_caches()
     
     flash(f'Fine of ₹{fine["total_amount"]:.2f} paid successfully for {fine["full_name"]}', 'success')
     return redirect(url_for('fines'))
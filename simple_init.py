@@ -2,151 +2,198 @@
 Simple Database Initialization Script
 """
 
+import atexit
 import sqlite3
-import os
+import sys
+from pathlib import Path
 from datetime import datetime
-from werkzeug.security import generate_password_hash
+
+# Hashes of the default passwords below, generated once with werkzeug's
+# generate_password_hash (pbkdf2:sha256:600000) so init does no PBKDF2 work
+ADMIN_PASSWORD_HASH = 'pbkdf2:sha256:600000$3muVoL7cFFBWXrqI$058e722c151c3206bfa2451f88890d2e27638d238b56448b80ef416c8b85e827'
+STUDENT_PASSWORD_HASH = 'pbkdf2:sha256:600000$kk6AhOLpigx8nfn0$b80d053872d1380801973e85de027b15e837012a47da03cbc0844d4ad4f3f91b'
+
+# Stored in PRAGMA user_version once init completes; bump it whenever
+# SCHEMA, the upgrade ALTERs or the seed rows change
+SCHEMA_VERSION = 1
+
+# Tables and the indexes for the app's filters, joins and orderings (the
+# same index names simple_app.py checks for, so it does not build them again)
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY,
+        student_id VARCHAR(20) UNIQUE,
+        username VARCHAR(80) UNIQUE NOT NULL,
+        email VARCHAR(120) UNIQUE NOT NULL,
+        password_hash VARCHAR(128) NOT NULL,
+        full_name VARCHAR(100) NOT NULL,
+        phone VARCHAR(20),
+        address TEXT,
+        user_type VARCHAR(20) DEFAULT 'student',
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        is_active BOOLEAN DEFAULT 1
+    );
+
+    CREATE TABLE IF NOT EXISTS books (
+        id INTEGER PRIMARY KEY,
+        title VARCHAR(200) NOT NULL,
+        author VARCHAR(100) NOT NULL,
+        isbn VARCHAR(20) UNIQUE NOT NULL,
+        publisher VARCHAR(100),
+        publication_year INTEGER,
+        category VARCHAR(50),
+        description TEXT,
+        total_copies INTEGER DEFAULT 1,
+        available_copies INTEGER DEFAULT 1,
+        price REAL DEFAULT 0.0,
+        location VARCHAR(50),
+        added_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+        is_active BOOLEAN DEFAULT 1
+    );
+
+    CREATE TABLE IF NOT EXISTS transactions (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        book_id INTEGER NOT NULL,
+        issue_date DATETIME DEFAULT CURRENT_TIMESTAMP,
+        due_date DATETIME NOT NULL,
+        return_date DATETIME,
+        status VARCHAR(20) DEFAULT 'issued',
+        notes TEXT,
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (book_id) REFERENCES books (id)
+    );
+
+    CREATE TABLE IF NOT EXISTS fines (
+        id INTEGER PRIMARY KEY,
+        transaction_id INTEGER NOT NULL,
+        amount REAL DEFAULT 0.0,
+        per_day_rate REAL DEFAULT 1.0,
+        days_late INTEGER DEFAULT 0,
+        total_amount REAL DEFAULT 0.0,
+        paid_amount REAL DEFAULT 0.0,
+        status VARCHAR(20) DEFAULT 'unpaid',
+        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+        paid_date DATETIME,
+        FOREIGN KEY (transaction_id) REFERENCES transactions (id)
+    );
+
+    CREATE INDEX IF NOT EXISTS ix_tx_status_due ON transactions (status, due_date);
+    CREATE INDEX IF NOT EXISTS ix_tx_status_user ON transactions (status, user_id);
+    CREATE INDEX IF NOT EXISTS ix_tx_book_status ON transactions (book_id, status);
+    CREATE INDEX IF NOT EXISTS ix_tx_user_created ON transactions (user_id, created_at DESC);
+    CREATE INDEX IF NOT EXISTS ix_tx_created ON transactions (created_at DESC);
+    CREATE INDEX IF NOT EXISTS ix_fines_status ON fines (status);
+    CREATE INDEX IF NOT EXISTS ix_fines_transaction ON fines (transaction_id);
+    CREATE INDEX IF NOT EXISTS ix_books_active_title ON books (is_active, title);
+    CREATE INDEX IF NOT EXISTS ix_users_active_name ON users (is_active, full_name);
+    CREATE INDEX IF NOT EXISTS ix_users_student_id ON users (student_id);
+"""
+
+# Sample books seeded into a new database
+SAMPLE_BOOKS = (
+    ('Python Programming', 'John Smith', '978-0-123456-78-9', 'Tech Books', 2020, 'Programming', 'Complete guide to Python programming', 3, 3, 'A1-101'),
+    ('Data Structures and Algorithms', 'Jane Doe', '978-0-234567-89-0', 'Computer Science Press', 2019, 'Computer Science', 'Fundamental concepts of data structures', 2, 2, 'B2-205'),
+    ('Web Development with Flask', 'Mike Johnson', '978-0-345678-90-1', 'Web Dev Books', 2021, 'Web Development', 'Learn Flask web framework', 1, 1, 'C3-301'),
+    ('Introduction to Algorithms', 'Thomas Cormen', '978-0-262-03384-8', 'MIT Press', 2009, 'Computer Science', 'Comprehensive introduction to algorithms', 2, 2, 'A2-102'),
+    ('Clean Code', 'Robert Martin', '978-0-13-235088-4', 'Prentice Hall', 2008, 'Programming', 'A handbook of agile software craftsmanship', 1, 1, 'B1-201'),
+    ('The Pragmatic Programmer', 'Andrew Hunt', '978-0-20-161622-4', 'Addison-Wesley', 1999, 'Programming', 'From journeyman to master', 2, 2, 'C2-302'),
+    ('Design Patterns', 'Erich Gamma', '978-0-201-63361-0', 'Addison-Wesley', 1994, 'Programming', 'Elements of reusable object-oriented software', 1, 1, 'A3-103'),
+    ('Refactoring', 'Martin Fowler', '978-0-13-475759-9', 'Addison-Wesley', 2018, 'Programming', 'Improving the design of existing code', 1, 1, 'B3-303'),
+)
+
+DB_PATH = Path(__file__).with_name('library.db')
+
+# Connection shared by every caller in the process, closed at exit
+_conn = None
+
+def get_connection():
+    """Return the shared database connection, opening it on first use"""
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+        # WAL with synchronous=NORMAL avoids an fsync on every commit and keeps
+        # temporary b-trees in memory; journal_mode=WAL persists in the file
+        _conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA cache_size=-64000;
+            PRAGMA mmap_size=268435456;
+        """)
+        atexit.register(_conn.close)
+    return _conn
 
 def create_database():
     """Create the database and tables"""
-    db_path = os.path.join(os.path.dirname(__file__), 'library.db')
-    
-    # Connect to database
-    conn = sqlite3.connect(db_path)
+    conn = get_connection()
     cursor = conn.cursor()
     
-    # Create users table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            student_id VARCHAR(20) UNIQUE,
-            username VARCHAR(80) UNIQUE NOT NULL,
-            email VARCHAR(120) UNIQUE NOT NULL,
-            password_hash VARCHAR(128) NOT NULL,
-            full_name VARCHAR(100) NOT NULL,
-            phone VARCHAR(20),
-            address TEXT,
-            user_type VARCHAR(20) DEFAULT 'student',
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            is_active BOOLEAN DEFAULT 1
-        )
-    ''')
+    # Nothing to do when a previous run already brought the file up to date
+    if cursor.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION:
+        print(f"Database is already up to date at: {DB_PATH}")
+        return
     
-    # Create books table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS books (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            title VARCHAR(200) NOT NULL,
-            author VARCHAR(100) NOT NULL,
-            isbn VARCHAR(20) UNIQUE NOT NULL,
-            publisher VARCHAR(100),
-            publication_year INTEGER,
-            category VARCHAR(50),
-            description TEXT,
-            total_copies INTEGER DEFAULT 1,
-            available_copies INTEGER DEFAULT 1,
-            price REAL DEFAULT 0.0,
-            location VARCHAR(50),
-            added_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-            is_active BOOLEAN DEFAULT 1
-        )
-    ''')
-
-    cursor.execute("PRAGMA table_info(books)")
-    columns = [row[1] for row in cursor.fetchall()]
-    if 'price' not in columns:
-        cursor.execute('ALTER TABLE books ADD COLUMN price REAL DEFAULT 0.0')
+    # Add columns missing from older databases; SQLite raises a
+    # "duplicate column" error when the column is already there (and "no
+    # such table" on a new database, where CREATE TABLE below adds them)
+    # Note: UNIQUE constraint cannot be added to existing table in SQLite
+    # The uniqueness of student_id will be enforced at application level
+    for ddl in ('ALTER TABLE books ADD COLUMN price REAL DEFAULT 0.0',
+                'ALTER TABLE users ADD COLUMN student_id VARCHAR(20)'):
+        try:
+            cursor.execute(ddl)
+        except sqlite3.OperationalError:
+            pass
     
-    cursor.execute("PRAGMA table_info(users)")
-    user_columns = [row[1] for row in cursor.fetchall()]
-    if 'student_id' not in user_columns:
-        cursor.execute('ALTER TABLE users ADD COLUMN student_id VARCHAR(20)')
-        # Note: UNIQUE constraint cannot be added to existing table in SQLite
-        # The uniqueness will be enforced at application level
+    # Progress messages, written out in one go once the init is committed
+    messages = []
     
-    # Create transactions table
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS transactions (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            book_id INTEGER NOT NULL,
-            issue_date DATETIME DEFAULT CURRENT_TIMESTAMP,
-            due_date DATETIME NOT NULL,
-            return_date DATETIME,
-            status VARCHAR(20) DEFAULT 'issued',
-            notes TEXT,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id),
-            FOREIGN KEY (book_id) REFERENCES books (id)
-        )
-    ''')
+    # Create the schema and seed it in one transaction, so the whole init
+    # is synced to disk once. The script opens the transaction itself since
+    # executescript commits any that is already open.
+    cursor.executescript('BEGIN;' + SCHEMA)
     
-    # Create fines table
+    # Add default admin user. Seed rows are inserted with OR IGNORE, so the
+    # UNIQUE username, email and ISBN columns skip any that already exist.
     cursor.execute('''
-        CREATE TABLE IF NOT EXISTS fines (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            transaction_id INTEGER NOT NULL,
-            amount REAL DEFAULT 0.0,
-            per_day_rate REAL DEFAULT 1.0,
-            days_late INTEGER DEFAULT 0,
-            total_amount REAL DEFAULT 0.0,
-            paid_amount REAL DEFAULT 0.0,
-            status VARCHAR(20) DEFAULT 'unpaid',
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            paid_date DATETIME,
-            FOREIGN KEY (transaction_id) REFERENCES transactions (id)
-        )
-    ''')
+        INSERT OR IGNORE INTO users (username, email, password_hash, full_name, user_type)
+        VALUES (?, ?, ?, ?, ?)
+    ''', ('hk866311@gmail.com', 'hk866311@gmail.com', ADMIN_PASSWORD_HASH, 'Library Administrator', 'admin'))
+    if cursor.rowcount:
+        messages.append("Default admin user created: username=hk866311@gmail.com, password=Hacker@2004")
     
-    conn.commit()
-    
-    # Add default admin user
-    cursor.execute("SELECT * FROM users WHERE username = 'hk866311@gmail.com'")
-    if not cursor.fetchone():
-        admin_password = generate_password_hash('Hacker@2004')
-        cursor.execute('''
-            INSERT INTO users (username, email, password_hash, full_name, user_type)
-            VALUES (?, ?, ?, ?, ?)
-        ''', ('hk866311@gmail.com', 'hk866311@gmail.com', admin_password, 'Library Administrator', 'admin'))
-        print("Default admin user created: username=hk866311@gmail.com, password=Hacker@2004")
-    
-    # Add sample books
-    cursor.execute("SELECT COUNT(*) FROM books")
-    if cursor.fetchone()[0] == 0:
-        sample_books = [
-            ('Python Programming', 'John Smith', '978-0-123456-78-9', 'Tech Books', 2020, 'Programming', 'Complete guide to Python programming', 3, 3, 'A1-101'),
-            ('Data Structures and Algorithms', 'Jane Doe', '978-0-234567-89-0', 'Computer Science Press', 2019, 'Computer Science', 'Fundamental concepts of data structures', 2, 2, 'B2-205'),
-            ('Web Development with Flask', 'Mike Johnson', '978-0-345678-90-1', 'Web Dev Books', 2021, 'Web Development', 'Learn Flask web framework', 1, 1, 'C3-301'),
-            ('Introduction to Algorithms', 'Thomas Cormen', '978-0-262-03384-8', 'MIT Press', 2009, 'Computer Science', 'Comprehensive introduction to algorithms', 2, 2, 'A2-102'),
-            ('Clean Code', 'Robert Martin', '978-0-13-235088-4', 'Prentice Hall', 2008, 'Programming', 'A handbook of agile software craftsmanship', 1, 1, 'B1-201'),
-            ('The Pragmatic Programmer', 'Andrew Hunt', '978-0-20-161622-4', 'Addison-Wesley', 1999, 'Programming', 'From journeyman to master', 2, 2, 'C2-302'),
-            ('Design Patterns', 'Erich Gamma', '978-0-201-63361-0', 'Addison-Wesley', 1994, 'Programming', 'Elements of reusable object-oriented software', 1, 1, 'A3-103'),
-            ('Refactoring', 'Martin Fowler', '978-0-13-475759-9', 'Addison-Wesley', 2018, 'Programming', 'Improving the design of existing code', 1, 1, 'B3-303')
-        ]
-        
-        cursor.executemany('''
-            INSERT INTO books (title, author, isbn, publisher, publication_year, category, description, total_copies, available_copies, location)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', sample_books)
-        print("Sample books added successfully!")
+    # Add sample books with one multi-row VALUES statement
+    placeholders = ', '.join(['(?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'] * len(SAMPLE_BOOKS))
+    cursor.execute(f'''
+        INSERT OR IGNORE INTO books (title, author, isbn, publisher, publication_year, category, description, total_copies, available_copies, location)
+        VALUES {placeholders}
+    ''', [value for book in SAMPLE_BOOKS for value in book])
+    if cursor.rowcount:
+        messages.append("Sample books added successfully!")
     
     # Add sample student
-    cursor.execute("SELECT * FROM users WHERE username = 'student1'")
-    if not cursor.fetchone():
-        student_password = generate_password_hash('student123')
-        cursor.execute('''
-            INSERT INTO users (username, email, password_hash, full_name, phone, address, user_type)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', ('student1', 'student1@college.edu', student_password, 'Alice Student', '123-456-7890', '123 College Street', 'student'))
-        print("Sample student created: username=student1, password=student123")
+    cursor.execute('''
+        INSERT OR IGNORE INTO users (username, email, password_hash, full_name, phone, address, user_type)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', ('student1', 'student1@college.edu', STUDENT_PASSWORD_HASH, 'Alice Student', '123-456-7890', '123 College Street', 'student'))
+    if cursor.rowcount:
+        messages.append("Sample student created: username=student1, password=student123")
     
+    cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
     conn.commit()
-    conn.close()
     
-    print(f"Database created successfully at: {db_path}")
-    print("\nLogin Credentials:")
-    print("Admin: username=hk866311@gmail.com, password=Hacker@2004")
-    print("Student: username=student1, password=student123")
+    # Let SQLite refresh the query planner statistics for the new tables
+    conn.execute('PRAGMA optimize')
+    
+    messages += [
+        f"Database created successfully at: {DB_PATH}",
+        "\nLogin Credentials:",
+        "Admin: username=hk866311@gmail.com, password=Hacker@2004",
+        "Student: username=student1, password=student123",
+    ]
+    sys.stdout.write('\n'.join(messages) + '\n')
 
 if __name__ == '__main__':
     create_database()
@@ -38,36 +38,16 @@ function initializeSearch() {
             return;
         }
         
-        $.ajax({
-            url: '/books/search',
-            method: 'GET',
-            data: { q: query },
-            success: function(data) {
-                searchResults.empty();
-                
-                if (data.length === 0) {
-                    searchResults.html('<div class="search-result-item">No books found</div>');
-                } else {
-                    data.forEach(function(book) {
-                        var availability = book.available ? 
-                            '<span class="badge bg-success">Available</span>' : 
-                            '<span class="badge bg-danger">Unavailable</span>';
-                        
-                        searchResults.append(
-                            '<div class="search-result-item" onclick="selectBook(' + book.id + ', \'' + book.title + '\')">' +
-                            '<strong>' + book.title + '</strong> by ' + book.author + ' ' + availability +
-                            '</div>'
-                        );
-                    });
-                }
-                
-                searchResults.show();
-            },
-            error: function() {
-                searchResults.html('<div class="search-result-item">Error searching books</div>');
-                searchResults.show();
-            }
-        });
+        searchResults.empty();
+        loadBookResults(query, null, searchResults);
+    });
+    
+    // Load the next page of books when "More results" is clicked
+    $(document).on('click', '#bookSearchResults .search-more', function(e) {
+        e.stopPropagation();
+        var after = $(this).data('after');
+        $(this).remove();
+        loadBookResults($('#bookSearch').val(), after, $('#bookSearchResults'));
     });
     
     // User search (admin only)
@@ -80,36 +60,16 @@ function initializeSearch() {
             return;
         }
         
-        $.ajax({
-            url: '/transactions/search_users',
-            method: 'GET',
-            data: { q: query },
-            success: function(data) {
-                searchResults.empty();
-                
-                if (data.length === 0) {
-                    searchResults.html('<div class="search-result-item">No users found</div>');
-                } else {
-                    data.forEach(function(user) {
-                        var userType = user.user_type === 'admin' ? 
-                            '<span class="badge bg-primary">Admin</span>' : 
-                            '<span class="badge bg-info">Student</span>';
-                        
-                        searchResults.append(
-                            '<div class="search-result-item" onclick="selectUser(' + user.id + ', \'' + user.full_name + '\')">' +
-                            '<strong>' + user.full_name + '</strong> (' + user.username + ') ' + userType +
-                            '</div>'
-                        );
-                    });
-                }
-                
-                searchResults.show();
-            },
-            error: function() {
-                searchResults.html('<div class="search-result-item">Error searching users</div>');
-                searchResults.show();
-            }
-        });
+        searchResults.empty();
+        loadUserResults(query, null, searchResults);
+    });
+    
+    // Load the next page of users when "More results" is clicked
+    $(document).on('click', '#userSearchResults .search-more', function(e) {
+        e.stopPropagation();
+        var after = $(this).data('after');
+        $(this).remove();
+        loadUserResults($('#userSearch').val(), after, $('#userSearchResults'));
     });
     
     // Hide search results when clicking outside
@@ -120,6 +80,94 @@ function initializeSearch() {
     });
 }
 
+// Fetch one page of book search results and append it to the list
+function loadBookResults(query, after, searchResults) {
+    var params = { q: query };
+    if (after) {
+        params.after = after;
+    }
+    
+    $.ajax({
+        url: '/books/search',
+        method: 'GET',
+        data: params,
+        success: function(data) {
+            if (data.results.length === 0 && !after) {
+                searchResults.html('<div class="search-result-item">No books found</div>');
+            } else {
+                data.results.forEach(function(book) {
+                    var availability = book.available ? 
+                        '<span class="badge bg-success">Available</span>' : 
+                        '<span class="badge bg-danger">Unavailable</span>';
+                    
+                    searchResults.append(
+                        '<div class="search-result-item" onclick="selectBook(' + book.id + ', \'' + book.title + '\')">' +
+                        '<strong>' + book.title + '</strong> by ' + book.author + ' ' + availability +
+                        '</div>'
+                    );
+                });
+            }
+            
+            if (data.next_cursor) {
+                searchResults.append(
+                    $('<div class="search-result-item search-more text-muted">More results...</div>')
+                        .data('after', data.next_cursor)
+                );
+            }
+            
+            searchResults.show();
+        },
+        error: function() {
+            searchResults.html('<div class="search-result-item">Error searching books</div>');
+            searchResults.show();
+        }
+    });
+}
+
+// Fetch one page of user search results and append it to the list
+function loadUserResults(query, after, searchResults) {
+    var params = { q: query };
+    if (after) {
+        params.after = after;
+    }
+    
+    $.ajax({
+        url: '/transactions/search_users',
+        method: 'GET',
+        data: params,
+        success: function(data) {
+            if (data.results.length === 0 && !after) {
+                searchResults.html('<div class="search-result-item">No users found</div>');
+            } else {
+                data.results.forEach(function(user) {
+                    var userType = user.user_type === 'admin' ? 
+                        '<span class="badge bg-primary">Admin</span>' : 
+                        '<span class="badge bg-info">Student</span>';
+                    
+                    searchResults.append(
+                        '<div class="search-result-item" onclick="selectUser(' + user.id + ', \'' + user.full_name + '\')">' +
+                        '<strong>' + user.full_name + '</strong> (' + user.username + ') ' + userType +
+                        '</div>'
+                    );
+                });
+            }
+            
+            if (data.next_cursor) {
+                searchResults.append(
+                    $('<div class="search-result-item search-more text-muted">More results...</div>')
+                        .data('after', data.next_cursor)
+                );
+            }
+            
+            searchResults.show();
+        },
+        error: function() {
+            searchResults.html('<div class="search-result-item">Error searching users</div>');
+            searchResults.show();
+        }
+    });
+}
+
 // Select book from search results
 function selectBook(bookId, bookTitle) {
     $('#book_id').val(bookId);